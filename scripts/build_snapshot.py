@@ -0,0 +1,39 @@
+"""Write a binary snapshot of the card dataset and its indexes.
+
+Usage:
+    python scripts/build_snapshot.py [--output PATH]
+
+The API loads the snapshot on startup instead of parsing the JSON files as
+long as the JSON content is unchanged.
+"""
+
+import argparse
+import time
+
+from ptcgp_api import data
+
+
+def main() -> None:
+    """Build all projections and indexes and pickle them."""
+    parser = argparse.ArgumentParser(description="Build data snapshot")
+    parser.add_argument(
+        "--output",
+        default=data.SNAPSHOT_PATH,
+        help="Zieldatei (Standard: DATA_SNAPSHOT bzw. DATA_DIR)",
+    )
+    args = parser.parse_args()
+    start = time.perf_counter()
+    # Importing ``data`` already loaded the dataset for the current JSON
+    dataset = data.get_dataset()
+    if dataset.shared is not None:
+        # Views into the shared file cannot be pickled
+        dataset = data.build_dataset(dataset.version)
+    dataset.warm()
+    data.write_snapshot(dataset, args.output)
+    elapsed = time.perf_counter() - start
+    version = dataset.version[:12]
+    print(f"Snapshot {args.output} ({version}) in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":  # pragma: no cover - manual utility
+    main()
@@ -3,6 +3,7 @@
 CI checks run for every commit, including automatic Dependabot updates.
 """
 
+import asyncio
 import logging
 import logging.handlers
 import os
@@ -13,7 +14,10 @@ import structlog
 import httpx
 
 
-from .routes import cards, users, meta
+from .compression import CompressionMiddleware
+from .pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from .storage import USER_DB
+from .routes import admin, cards, users, meta
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
@@ -60,11 +64,14 @@ app.add_middleware(
     allow_origins=ALLOW_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[TOTAL_COUNT_HEADER, NEXT_CURSOR_HEADER],
 )
+app.add_middleware(CompressionMiddleware)
 
 app.include_router(cards.router)
 app.include_router(users.router)
 app.include_router(meta.router)
+app.include_router(admin.router)
 
 
 @app.exception_handler(Exception)
@@ -86,12 +93,31 @@ async def startup() -> None:
     if os.getenv("API_KEY"):
         logger.info("API authentication enabled")
     app.state.http_client = httpx.AsyncClient()
+    cards.load_image_snapshot()
+    tasks: list[asyncio.Task] = []
+    if os.getenv("IMAGE_PREWARM") and not os.getenv("SKIP_IMAGE_CHECKS"):
+        client = app.state.http_client
+        tasks.append(asyncio.create_task(cards.prewarm_images(client)))
+    if admin.DATA_RELOAD_INTERVAL > 0:
+        tasks.append(asyncio.create_task(admin.watch_data_files()))
+    if USER_DB:
+        # Load stored users, decks and groups without delaying startup
+        load = asyncio.to_thread(users.load_store)
+        tasks.append(asyncio.create_task(load))
+        if users.USER_DB_FLUSH_INTERVAL > 0:
+            tasks.append(asyncio.create_task(users.flush_store()))
+    app.state.background_tasks = tasks
     logger.info("Application startup complete")
 
 
 @app.on_event("shutdown")
 async def shutdown() -> None:
     """Close resources on shutdown."""
+    tasks: list[asyncio.Task] = getattr(app.state, "background_tasks", [])
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.to_thread(users.close_store)
     client: httpx.AsyncClient | None = getattr(app.state, "http_client", None)
     if client and not client.is_closed:
         await client.aclose()
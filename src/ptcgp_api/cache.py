@@ -0,0 +1,181 @@
+"""Cache of pre-serialized JSON responses for static data routes.
+
+Responses also carry an ``ETag`` derived from the cache key, which
+contains the dataset version, so conditional requests are answered with
+``304 Not Modified`` before any data is looked up or encoded. Bodies with
+image URLs get weak tags, since the URLs follow availability checks. Compressed
+variants of cached bodies are stored next to them and reused.
+"""
+
+import hashlib
+import os
+import threading
+from typing import Any, Dict, Hashable, Tuple
+
+from cachetools import TTLCache
+from fastapi import Request, status
+from fastapi.responses import JSONResponse, Response
+
+from .compression import (
+    COMPRESSION_MIN_SIZE,
+    choose_encoding,
+    compress,
+    encoded_etag,
+    strip_encoding,
+)
+
+RESPONSE_CACHE_BYTES = int(os.getenv("RESPONSE_CACHE_BYTES", "33554432"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(60 * 60)))
+CACHE_CONTROL = os.getenv("CACHE_CONTROL", "public, max-age=300")
+
+
+def make_etag(key: Hashable, weak: bool = False) -> str:
+    """Return an ETag for ``key``.
+
+    Keys include the dataset version and every parameter that shapes the
+    body, so equal keys describe the same representation. Use ``weak``
+    when the body also depends on state outside the key, such as image
+    URLs that switch between ``high.webp`` and ``low.webp``.
+    """
+    digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16)
+    etag = f'"{digest.hexdigest()}"'
+    return f"W/{etag}" if weak else etag
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    """Return the validator and caching headers for a response."""
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(request: Request | None, etag: str) -> Response | None:
+    """Return a 304 response if ``If-None-Match`` lists ``etag``.
+
+    Tags of compressed variants match their uncompressed representation
+    and are echoed back unchanged. Tags compare weakly, as required for
+    ``If-None-Match``. ``*`` is ignored: it is checked before
+    the resource and parameters are validated and would turn a 404 or 400
+    into a 304.
+    """
+    if request is None:
+        return None
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    prefix = "W/" if etag.startswith("W/") else ""
+    opaque = etag.removeprefix("W/")
+    for tag in header.split(","):
+        tag = tag.strip().removeprefix("W/")
+        if strip_encoding(tag) == opaque:
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers=cache_headers(prefix + tag),
+            )
+    return None
+
+
+# Encoded body and the headers sent with it besides the caching headers
+Entry = Tuple[bytes, Dict[str, str]]
+
+
+class ResponseCache:
+    """Store encoded JSON bodies keyed by endpoint and parameters.
+
+    The cache is bounded by the total size of the stored bodies in bytes
+    and evicts the least recently used entries first. Compressed variants
+    are created on the first cache hit per encoding and count towards the
+    same bound.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._bodies: TTLCache[Hashable, Entry] = TTLCache(
+            maxsize=maxsize,
+            ttl=ttl,
+            getsizeof=lambda entry: len(entry[0]),
+        )
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        key: Hashable,
+        request: Request | None = None,
+        weak: bool = False,
+    ) -> Response | None:
+        """Return a ready-to-send response for ``key`` if cached.
+
+        If ``request`` already holds the current representation a bodyless
+        304 response is returned, cached or not. ``weak`` is passed on to
+        ``make_etag``.
+        """
+        etag = make_etag(key, weak)
+        unchanged = not_modified(request, etag)
+        if unchanged is not None:
+            return unchanged
+        with self._lock:
+            entry = self._bodies.get(key)
+        if entry is None:
+            return None
+        body, extra = entry
+        headers = {**extra, **cache_headers(etag)}
+        if len(body) >= COMPRESSION_MIN_SIZE and request is not None:
+            headers["Vary"] = "Accept-Encoding"
+            accept = request.headers.get("accept-encoding", "")
+            encoding = choose_encoding(accept)
+            if encoding is not None:
+                body = self._variant(key, body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["ETag"] = encoded_etag(etag, encoding)
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers=headers,
+        )
+
+    def _variant(self, key: Hashable, body: bytes, encoding: str) -> bytes:
+        """Return ``body`` compressed with ``encoding``, cached per key."""
+        variant_key = (key, encoding)
+        with self._lock:
+            entry = self._bodies.get(variant_key)
+        if entry is None:
+            compressed = compress(body, encoding, cached=True)
+            with self._lock:
+                self._bodies[variant_key] = (compressed, {})
+            return compressed
+        return entry[0]
+
+    def store(
+        self,
+        key: Hashable,
+        content: Any,
+        weak: bool = False,
+        headers: Dict[str, str] | None = None,
+    ) -> Response:
+        """Encode ``content``, cache the bytes and return the response.
+
+        ``content`` may already be encoded JSON. ``headers`` are cached
+        with the body and sent on every hit.
+        """
+        extra = dict(headers or {})
+        all_headers = {**extra, **cache_headers(make_etag(key, weak))}
+        if isinstance(content, bytes):
+            response: Response = Response(
+                content=content,
+                media_type="application/json",
+                headers=all_headers,
+            )
+        else:
+            response = JSONResponse(content, headers=all_headers)
+        if len(response.body) <= self._bodies.maxsize:
+            with self._lock:
+                self._bodies[key] = (bytes(response.body), extra)
+        return response
+
+    def clear(self) -> None:
+        """Drop all cached responses."""
+        with self._lock:
+            self._bodies.clear()
+
+    def __len__(self) -> int:
+        return len(self._bodies)
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_BYTES, RESPONSE_CACHE_TTL)
@@ -0,0 +1,206 @@
+"""Response compression with gzip and, if installed, brotli or zstd.
+
+``CompressionMiddleware`` compresses JSON and text responses of at least
+``COMPRESSION_MIN_SIZE`` bytes with the best encoding the client accepts.
+Responses that already carry ``Content-Encoding`` pass through unchanged,
+which lets ``ResponseCache`` serve precompressed variants of cached bodies.
+"""
+
+import os
+import zlib
+from typing import Callable, Dict, List
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # pragma: no cover - optional dependency
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:  # pragma: no cover - optional dependency
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# Supported encodings, most preferred first
+ENCODINGS: List[str] = [
+    name
+    for name, module in (("br", brotli), ("zstd", zstandard), ("gzip", zlib))
+    if module is not None
+]
+_COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+class _Compressor:
+    """Incremental compressor with a common interface for all encodings."""
+
+    def __init__(self, encoding: str, level: int) -> None:
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=level)
+            self.compress: Callable[[bytes], bytes] = self._obj.process
+            self.finish: Callable[[], bytes] = self._obj.finish
+        elif encoding == "zstd":
+            cctx = zstandard.ZstdCompressor(level=level)
+            self._obj = cctx.compressobj()
+            self.compress = self._obj.compress
+            self.finish = self._obj.flush
+        else:
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+            self.compress = self._obj.compress
+            self.finish = self._obj.flush
+
+
+# Levels for responses compressed on the fly and for cached variants that
+# are compressed once and served many times.
+_STREAM_LEVELS: Dict[str, int] = {"br": 4, "zstd": 3, "gzip": 6}
+_CACHED_LEVELS: Dict[str, int] = {"br": 9, "zstd": 12, "gzip": 9}
+
+
+def compress(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    """Return ``body`` compressed with ``encoding``."""
+    levels = _CACHED_LEVELS if cached else _STREAM_LEVELS
+    compressor = _Compressor(encoding, levels[encoding])
+    return compressor.compress(body) + compressor.finish()
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """Return the supported encoding the header ranks highest.
+
+    The order of ``ENCODINGS`` only breaks ties between equal q-values.
+    ``None`` means no compression, also when the client ranks
+    ``identity`` above every supported encoding.
+    """
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    if accepted.get("identity", 0.0) > best_quality:
+        return None
+    return best
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """Return the ETag of the ``encoding`` variant of a representation."""
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else etag
+
+
+def strip_encoding(etag: str) -> str:
+    """Return the ETag of the unencoded representation."""
+    for encoding in ENCODINGS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[: -len(suffix)] + '"'
+    return etag
+
+
+def is_compressible(headers: Headers) -> bool:
+    """Return whether a response with ``headers`` should be compressed."""
+    content_type = headers.get("content-type", "")
+    return "content-encoding" not in headers and content_type.startswith(
+        _COMPRESSIBLE_TYPES
+    )
+
+
+class CompressionMiddleware:
+    """Compress eligible HTTP responses according to ``Accept-Encoding``.
+
+    Complete bodies below ``minimum_size`` are sent as is; streamed bodies
+    are compressed chunk by chunk.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = Headers(scope=scope).get("accept-encoding", "")
+        encoding = choose_encoding(accept)
+        responder = _Responder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _Responder:
+    """Rewrite the messages of one response."""
+
+    def __init__(
+        self,
+        send: Send,
+        encoding: str | None,
+        minimum_size: int,
+    ) -> None:
+        self._send = send
+        self._encoding = encoding
+        self._minimum_size = minimum_size
+        self._start: Message | None = None
+        self._compressor: _Compressor | None = None
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self._start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+        if self._start is not None:
+            start, self._start = self._start, None
+            await self._first_body(start, message)
+            return
+        if self._compressor is not None:
+            body = self._compressor.compress(message.get("body", b""))
+            more = message.get("more_body", False)
+            if not more:
+                body += self._compressor.finish()
+            message = {**message, "body": body}
+        await self._send(message)
+
+    async def _first_body(self, start: Message, message: Message) -> None:
+        headers = MutableHeaders(raw=start["headers"])
+        body: bytes = message.get("body", b"")
+        more = message.get("more_body", False)
+        if not is_compressible(headers) or (
+            not more and len(body) < self._minimum_size
+        ):
+            await self._send(start)
+            await self._send(message)
+            return
+        headers.add_vary_header("Accept-Encoding")
+        if self._encoding is None:
+            await self._send(start)
+            await self._send(message)
+            return
+        headers["Content-Encoding"] = self._encoding
+        if "etag" in headers:
+            headers["ETag"] = encoded_etag(headers["etag"], self._encoding)
+        if more:
+            del headers["Content-Length"]
+            level = _STREAM_LEVELS[self._encoding]
+            self._compressor = _Compressor(self._encoding, level)
+            body = self._compressor.compress(body)
+        else:
+            body = compress(body, self._encoding)
+            headers["Content-Length"] = str(len(body))
+        await self._send(start)
+        await self._send({**message, "body": body})
@@ -1,10 +1,39 @@
-"""Load card data and build search indexes at import time."""
+"""Load card data and build search indexes at import time.
 
+All derived structures live in a ``Dataset``. A pickled snapshot of it can
+be written with ``scripts/build_snapshot.py``; it is used instead of the
+JSON files as long as their content hash matches. ``reload_dataset``
+rebuilds the dataset after the files changed and swaps it atomically.
+
+With ``DATA_SHARED`` the projections and the token index are served from a
+memory-mapped file that all worker processes share (see ``shared``).
+"""
+
+import gc
+import hashlib
 import json
 import os
-from typing import Dict, List, Any
+import pickle
+import re
+import sys
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Any, Optional, Sequence, Tuple
+
+import structlog
+
 from .models import Language
+from .shared import (
+    ProjectionTable,
+    SharedStore,
+    attach_shared,
+    write_shared,
+)
 
+logger = structlog.get_logger(__name__)
 
 # Directory of this file -> repository root
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
@@ -14,51 +43,19 @@ CARDS_PATH = os.path.join(DATA_DIR, "cards.json")
 SETS_PATH = os.path.join(DATA_DIR, "sets.json")
 EVENTS_PATH = os.path.join(DATA_DIR, "events.json")
 TOURNAMENTS_PATH = os.path.join(DATA_DIR, "tournaments.json")
+SOURCE_PATHS = [CARDS_PATH, SETS_PATH, EVENTS_PATH, TOURNAMENTS_PATH]
+_DEFAULT_SNAPSHOT = os.path.join(DATA_DIR, "dataset.pickle")
+# An empty value, as in ``.env.example``, also means the default
+SNAPSHOT_PATH = os.getenv("DATA_SNAPSHOT") or _DEFAULT_SNAPSHOT
+# Bump when the layout of ``Dataset`` changes to invalidate old snapshots
+SNAPSHOT_FORMAT = 6
+# Memory-mapped file shared by all workers, e.g. below ``/dev/shm``
+SHARED_PATH = os.getenv("DATA_SHARED", "")
 
-for path in [CARDS_PATH, SETS_PATH, EVENTS_PATH, TOURNAMENTS_PATH]:
+for path in SOURCE_PATHS:
     if not os.path.exists(path):
         raise FileNotFoundError(f"Required data file not found: {path}")
 
-with open(CARDS_PATH, encoding="utf-8") as f:
-    _raw_cards: List[Dict[str, Any]] = json.load(f)
-
-with open(SETS_PATH, encoding="utf-8") as f:
-    _sets: Dict[str, Dict[str, Any]] = {s["id"]: s for s in json.load(f)}
-
-with open(EVENTS_PATH, encoding="utf-8") as f:
-    _events: List[Dict[str, Any]] = json.load(f)
-
-with open(TOURNAMENTS_PATH, encoding="utf-8") as f:
-    _tournaments: List[Dict[str, Any]] = json.load(f)
-
-# Build cards with global and local ids
-_cards: List[Dict[str, Any]] = []
-_cards_by_id: Dict[str, Dict[str, Any]] = {}
-_index_by_set: Dict[str, set] = {}
-_index_by_type: Dict[str, set] = {}
-_index_by_rarity: Dict[str, set] = {}
-_index_by_trainer_type: Dict[str, set] = {}
-
-set_counter: Dict[str, int] = {}
-
-for idx, card in enumerate(_raw_cards, start=1):
-    set_id = card.get("set_id")
-    set_counter[set_id] = set_counter.get(set_id, 0) + 1
-    obj = card.copy()
-    obj["id"] = f"{idx:03d}"
-    obj["_local_id"] = f"{set_counter[set_id]:03d}"
-    _cards.append(obj)
-    _cards_by_id[obj["id"]] = obj
-
-    # Build filter indexes for faster lookups
-    _index_by_set.setdefault(set_id, set()).add(obj["id"])
-    for t in obj.get("types", []):
-        _index_by_type.setdefault(t, set()).add(obj["id"])
-    if trainer_type := obj.get("trainerType"):
-        _index_by_trainer_type.setdefault(trainer_type, set()).add(obj["id"])
-    if rarity := obj.get("rarity"):
-        _index_by_rarity.setdefault(rarity, set()).add(obj["id"])
-
 
 LANGUAGES = {lang.value for lang in Language}
 
@@ -74,8 +71,9 @@ def filter_language(data: Any, lang: str, default_lang: str = "de") -> Any:
                 return filter_language(data[lang], lang, default_lang)
             if default_lang in data:
                 return filter_language(data[default_lang], lang, default_lang)
+            # Sorted, so every process picks the same fallback
             return filter_language(
-                data[next(iter(lang_keys))],
+                data[min(lang_keys)],
                 lang,
                 default_lang,
             )
@@ -86,31 +84,38 @@ def filter_language(data: Any, lang: str, default_lang: str = "de") -> Any:
     return data
 
 
+def normalize_text(text: str) -> str:
+    """Return ``text`` case-folded, NFKD-decomposed and without accents.
+
+    Used for both indexed text and queries so that e.g. ``pokemon`` finds
+    ``Pokémon``, ``strasse`` finds ``Straße`` and Hangul matches by jamo.
+    """
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
 def build_search_index(
     cards: List[Dict[str, Any]],
 ) -> Dict[str, Dict[str, Dict[str, str]]]:
-    """Create a full text search index for the given cards."""
+    """Create a full text search index of normalized card texts."""
+
+    def text(value: Any, lang: str) -> str:
+        return normalize_text(str(filter_language(value, lang)))
+
     index: Dict[str, Dict[str, Dict[str, str]]] = {}
     for card in cards:
         per_lang: Dict[str, Dict[str, str]] = {}
         for lang in LANGUAGES:
-            name_txt = str(filter_language(card.get("name", ""), lang)).lower()
+            name_txt = text(card.get("name", ""), lang)
             abil_parts: List[str] = []
             for ab in card.get("abilities", []):
-                abil_parts.append(
-                    str(filter_language(ab.get("name", ""), lang)).lower()
-                )
-                abil_parts.append(
-                    str(filter_language(ab.get("effect", ""), lang)).lower()
-                )
+                abil_parts.append(text(ab.get("name", ""), lang))
+                abil_parts.append(text(ab.get("effect", ""), lang))
             abil_txt = " ".join(abil_parts)
             atk_parts: List[str] = []
             for at in card.get("attacks", []):
-                name_val = filter_language(at.get("name", ""), lang)
-                atk_parts.append(str(name_val).lower())
-                atk_parts.append(
-                    str(filter_language(at.get("effect", ""), lang)).lower()
-                )
+                atk_parts.append(text(at.get("name", ""), lang))
+                atk_parts.append(text(at.get("effect", ""), lang))
             atk_txt = " ".join(atk_parts)
             per_lang[lang] = {
                 "name": name_txt,
@@ -122,19 +127,892 @@ def build_search_index(
     return index
 
 
-_search_index = build_search_index(_cards)
+# Attributes of ``build_filter_bitmaps`` reported by ``facet_counts``
+FACET_ATTRIBUTES = (
+    "set_id",
+    "type",
+    "rarity",
+    "stage",
+    "trainer_type",
+    "booster",
+)
+# Rarities from most common to rarest; unknown values sort last
+RARITY_ORDER = (
+    "None",
+    "One Diamond",
+    "Two Diamond",
+    "Three Diamond",
+    "Four Diamond",
+    "One Star",
+    "Two Star",
+    "Three Star",
+    "One Shiny",
+    "Two Shiny",
+    "Crown",
+)
+# Keys accepted by ``parse_sort``; ``name`` is collated per language
+SORT_KEYS = ("id", "name", "hp", "retreat", "rarity", "release")
+# Sort specs whose permutation is kept per dataset
+SORT_CACHE_SIZE = 128
+# Sort keys with ``True`` for descending order, e.g. ``(("hp", True),)``
+SortSpec = Tuple[Tuple[str, bool], ...]
+SEARCH_FIELDS = ("name", "abilities", "attacks")
+# Score per matching query token; exact token matches count double.
+SEARCH_FIELD_WEIGHTS = {"name": 4, "abilities": 2, "attacks": 1}
+_TOKEN_RE = re.compile(r"\w+")
+
+# A card or set reduced to one language
+Projection = Dict[str, Any]
+# Sorted normalized names and the matching ``id``/``name`` pairs
+NameIndex = Tuple[List[str], List[Dict[str, str]]]
+# lang -> field -> (sorted tokens, posting list of card ordinals per token)
+TokenIndex = Dict[str, Dict[str, Tuple[List[str], List[array]]]]
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text produced by ``normalize_text`` into word tokens."""
+    return _TOKEN_RE.findall(text)
+
+
+def build_token_index(
+    cards: List[Dict[str, Any]],
+    search_index: Dict[str, Dict[str, Dict[str, str]]],
+) -> TokenIndex:
+    """Create an inverted index from ``build_search_index`` output.
+
+    Every token maps to the ascending ordinals of the cards containing it.
+    Tokens are kept sorted per field so prefixes resolve with a bisect.
+    """
+    index: TokenIndex = {}
+    for lang in LANGUAGES:
+        per_field: Dict[str, Tuple[List[str], List[array]]] = {}
+        for field in SEARCH_FIELDS:
+            postings: Dict[str, array] = {}
+            for ordinal, card in enumerate(cards):
+                text = search_index[card["id"]][lang][field]
+                for token in set(tokenize(text)):
+                    postings.setdefault(token, array("I")).append(ordinal)
+            tokens = sorted(postings)
+            per_field[field] = (tokens, [postings[t] for t in tokens])
+        index[lang] = per_field
+    return index
+
+
+def _filter_values(card: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Return the values a card can be filtered by, per attribute."""
+    evo = card.get("evolveFrom")
+    evo_names = evo.values() if isinstance(evo, dict) else [evo] if evo else []
+    values = {
+        "set_id": [card.get("set_id")],
+        "type": card.get("types", []),
+        "trainer_type": [card.get("trainerType")],
+        "rarity": [card.get("rarity")],
+        "category": [card.get("category")],
+        "stage": [card.get("stage")],
+        "booster": card.get("boosters", []),
+        "illustrator": [card.get("illustrator")],
+        "suffix": [card.get("suffix")],
+        "weakness": [w.get("type") for w in card.get("weaknesses", [])],
+        "evolve_from": [str(n).lower() for n in evo_names],
+    }
+    return {k: [v for v in vals if v] for k, vals in values.items()}
+
+
+def build_filter_bitmaps(
+    cards: List[Dict[str, Any]],
+) -> Tuple[Dict[str, Dict[str, int]], Dict[str, Tuple[List[int], List[int]]]]:
+    """Create bitmaps over card ordinals for all filterable attributes.
+
+    Bit ``i`` of a bitmap is set when ``cards[i]`` has the value. Numeric
+    attributes are stored as sorted distinct values together with
+    cumulative bitmaps of all cards whose value is less or equal.
+    """
+    bitmaps: Dict[str, Dict[str, int]] = {}
+    numbers: Dict[str, Dict[int, int]] = {"hp": {}, "retreat": {}}
+    for ordinal, card in enumerate(cards):
+        bit = 1 << ordinal
+        for attr, vals in _filter_values(card).items():
+            attr_bitmaps = bitmaps.setdefault(attr, {})
+            for val in vals:
+                attr_bitmaps[val] = attr_bitmaps.get(val, 0) | bit
+        for attr, by_value in numbers.items():
+            val = int(card.get(attr) or 0)
+            by_value[val] = by_value.get(val, 0) | bit
+    ranges: Dict[str, Tuple[List[int], List[int]]] = {}
+    for attr, by_value in numbers.items():
+        values = sorted(by_value)
+        cumulative: List[int] = []
+        acc = 0
+        for val in values:
+            acc |= by_value[val]
+            cumulative.append(acc)
+        ranges[attr] = (values, cumulative)
+    return bitmaps, ranges
+
+
+def compact(value: Any, memo: Dict[Tuple[Any, ...], Any]) -> Any:
+    """Return ``value`` with interned strings and equal containers shared.
+
+    Reprints repeat names, attacks and effect texts verbatim, so keeping
+    one object per distinct value roughly halves the size of the card data.
+    Children are compacted first, which lets containers be keyed by the
+    identity of their items. The results may be shared; never mutate them.
+    """
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        value = {sys.intern(k): compact(v, memo) for k, v in value.items()}
+        items = value.items()
+    elif isinstance(value, list):
+        value = [compact(v, memo) for v in value]
+        items = enumerate(value)
+    else:
+        return value
+    key = (type(value),) + tuple(
+        (k, id(v) if isinstance(v, (str, dict, list)) else (type(v), v))
+        for k, v in items
+    )
+    return memo.setdefault(key, value)
+
+
+@dataclass(frozen=True, slots=True)
+class Card:
+    """A loaded card.
+
+    ``source`` is the card JSON plus its ``id`` with all strings interned;
+    responses are built from it by ``Dataset.get_card_projections``. The
+    other attributes are the values routes need without touching it.
+    """
+
+    id: str
+    local_id: str
+    set_id: str
+    category: Optional[str]
+    rarity: Optional[str]
+    stage: Optional[str]
+    types: Tuple[str, ...]
+    hp: int
+    retreat: int
+    source: Dict[str, Any]
+
+
+def build_cards(raw_cards: List[Dict[str, Any]]) -> List[Card]:
+    """Return ``raw_cards`` as ``Card`` objects with global and local ids."""
+    cards: List[Card] = []
+    set_counter: Dict[str, int] = {}
+    memo: Dict[Tuple[Any, ...], Any] = {}
+    for idx, raw in enumerate(raw_cards, start=1):
+        source = compact({**raw, "id": f"{idx:03d}"}, memo)
+        set_id = source.get("set_id")
+        set_counter[set_id] = set_counter.get(set_id, 0) + 1
+        card = Card(
+            id=source["id"],
+            local_id=sys.intern(f"{set_counter[set_id]:03d}"),
+            set_id=set_id,
+            category=source.get("category"),
+            rarity=source.get("rarity"),
+            stage=source.get("stage"),
+            types=tuple(source.get("types", [])),
+            hp=int(source.get("hp") or 0),
+            retreat=int(source.get("retreat") or 0),
+            source=source,
+        )
+        cards.append(card)
+    return cards
+
+
+def _normalize_lang(lang: Language | str) -> str:
+    """Return the language code, mapping unknown codes to ``de``.
+
+    ``filter_language`` falls back to German for unknown languages, so
+    their projection is identical to the German one.
+    """
+    lang_val = lang.value if isinstance(lang, Language) else lang
+    return lang_val if lang_val in LANGUAGES else "de"
+
+
+def iter_ordinals(mask: int) -> Iterator[int]:
+    """Yield the set bits of ``mask`` in ascending (load) order."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def parse_sort(value: str) -> SortSpec:
+    """Parse ``hp,-name`` into a sort spec; ``-`` marks descending keys.
+
+    Raises ``ValueError`` for unknown keys.
+    """
+    spec: List[Tuple[str, bool]] = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        key = part.lstrip("+-")
+        if key not in SORT_KEYS:
+            raise ValueError(key)
+        spec.append((key, part.startswith("-")))
+    return tuple(spec)
+
+
+def dense_ranks(values: Sequence[Any]) -> array:
+    """Return the rank of every value among the distinct ``values``."""
+    rank = {value: i for i, value in enumerate(sorted(set(values)))}
+    return array("I", (rank[value] for value in values))
+
+
+def iter_sorted(
+    mask: int,
+    order: Sequence[int],
+    start: int = 0,
+) -> Iterator[Tuple[int, int]]:
+    """Yield ``(position, ordinal)`` of ``order`` for ordinals in ``mask``."""
+    for position in range(start, len(order)):
+        ordinal = order[position]
+        if mask >> ordinal & 1:
+            yield position, ordinal
+
+
+class Dataset:
+    """Cards, metadata and every structure derived from them.
+
+    Language projections and name indexes are filled lazily on first use;
+    ``warm`` builds them for all languages up front. After ``use_shared``
+    projections and token lookups read from a shared mapped file instead.
+    """
+
+    def __init__(
+        self,
+        raw_cards: List[Dict[str, Any]],
+        sets: List[Dict[str, Any]],
+        events: List[Dict[str, Any]],
+        tournaments: List[Dict[str, Any]],
+        version: str,
+        text_index: bool = True,
+    ) -> None:
+        self.version = version
+        self.sets: Dict[str, Dict[str, Any]] = {s["id"]: s for s in sets}
+        self.events = events
+        self.tournaments = tournaments
+        self.cards = build_cards(raw_cards)
+        self.cards_by_id = {card.id: card for card in self.cards}
+        self.ordinals = {card.id: i for i, card in enumerate(self.cards)}
+        sources = [card.source for card in self.cards]
+
+        self.all_cards_mask = (1 << len(self.cards)) - 1
+        self.bitmaps, self.ranges = build_filter_bitmaps(sources)
+        self.search_index: Dict[str, Dict[str, Dict[str, str]]] = {}
+        self.token_index: TokenIndex = {}
+        if text_index:
+            self.build_text_index()
+
+        self.card_projections: Dict[str, Sequence[Projection]] = {}
+        self.set_projections: Dict[str, Dict[str, Projection]] = {}
+        self.name_indexes: Dict[str, NameIndex] = {}
+        self.shared: SharedStore | None = None
+
+        rarity_rank = {r: i for i, r in enumerate(RARITY_ORDER)}
+        release = {s["id"]: s.get("releaseDate") or "" for s in sets}
+        self.sort_ranks: Dict[str, array] = {
+            "id": array("I", range(len(self.cards))),
+            "hp": dense_ranks([c.hp for c in self.cards]),
+            "retreat": dense_ranks([c.retreat for c in self.cards]),
+            "rarity": array(
+                "I",
+                (
+                    rarity_rank.get(c.rarity or "", len(RARITY_ORDER))
+                    for c in self.cards
+                ),
+            ),
+            "release": dense_ranks(
+                [(release.get(c.set_id, ""), c.set_id) for c in self.cards]
+            ),
+        }
+        self.name_ranks: Dict[str, array] = {}
+        self.sort_orders: Dict[Tuple[SortSpec, str], Tuple[array, array]] = {}
+        for key in self.sort_ranks:
+            for descending in (False, True):
+                self.sort_order(((key, descending),), "de")
+
+    def card_ids_by_value(self, attr: str) -> Dict[str, set]:
+        """Return the IDs of the cards per value of a filter attribute.
+
+        Derived from ``bitmaps`` on every call; only the legacy
+        ``_index_by_*`` module attributes use it.
+        """
+        cards = self.cards
+        return {
+            value: {cards[o].id for o in iter_ordinals(mask)}
+            for value, mask in self.bitmaps.get(attr, {}).items()
+        }
+
+    def build_text_index(self) -> None:
+        """Build the search and token indexes over all card texts.
+
+        Skipped by workers that read the token index from a shared file.
+        """
+        sources = [card.source for card in self.cards]
+        self.search_index = build_search_index(sources)
+        self.token_index = build_token_index(sources, self.search_index)
+
+    def use_shared(self, store: SharedStore) -> None:
+        """Serve card projections and token lookups from ``store``.
+
+        The per-process copies are dropped; projections are decoded from the
+        mapped file on access instead.
+        """
+        self.shared = store
+        self.search_index = {}
+        self.token_index = store.token_index()  # type: ignore[assignment]
+        self.card_projections = dict(store.projections())
+
+    def _range_mask(
+        self,
+        attr: str,
+        low: Optional[int],
+        high: Optional[int],
+    ) -> int:
+        """Return the bitmap of cards with ``low <= attr <= high``."""
+        values, cumulative = self.ranges[attr]
+        mask = self.all_cards_mask
+        if high is not None:
+            pos = bisect_right(values, high) - 1
+            mask = cumulative[pos] if pos >= 0 else 0
+        if low is not None:
+            pos = bisect_left(values, low) - 1
+            if pos >= 0:
+                mask &= ~cumulative[pos]
+        return mask
+
+    def filter_cards(
+        self,
+        *,
+        set_id: Optional[str] = None,
+        type_: Optional[str] = None,
+        trainer_type: Optional[str] = None,
+        rarity: Optional[str] = None,
+        category: Optional[str] = None,
+        evolve_from: Optional[str] = None,
+        stage: Optional[str] = None,
+        booster: Optional[str] = None,
+        illustrator: Optional[str] = None,
+        suffix: Optional[str] = None,
+        weakness: Optional[str] = None,
+        hp_min: Optional[int] = None,
+        hp_max: Optional[int] = None,
+        retreat_min: Optional[int] = None,
+        retreat_max: Optional[int] = None,
+    ) -> int:
+        """Return the bitmap of cards matching all given filters.
+
+        Every filter is a dictionary lookup followed by an integer AND, so
+        the cost does not depend on how many filters are combined.
+        """
+        equals = {
+            "set_id": set_id,
+            "type": type_,
+            "trainer_type": trainer_type,
+            "rarity": rarity,
+            "category": category,
+            "stage": stage,
+            "booster": booster,
+            "illustrator": illustrator,
+            "suffix": suffix,
+            "weakness": weakness,
+            "evolve_from": str(evolve_from).lower() if evolve_from else None,
+        }
+        mask = self.all_cards_mask
+        for attr, val in equals.items():
+            if val:
+                mask &= self.bitmaps.get(attr, {}).get(val, 0)
+        if hp_min is not None or hp_max is not None:
+            mask &= self._range_mask("hp", hp_min, hp_max)
+        if retreat_min is not None or retreat_max is not None:
+            mask &= self._range_mask("retreat", retreat_min, retreat_max)
+        return mask
+
+    def facet_counts(
+        self,
+        mask: int,
+        attrs: Sequence[str] = FACET_ATTRIBUTES,
+    ) -> Dict[str, Dict[str, int]]:
+        """Return how many cards of ``mask`` have each value of ``attrs``.
+
+        Counts are popcounts of the value bitmaps intersected with
+        ``mask``; values without matches are left out.
+        """
+        counts: Dict[str, Dict[str, int]] = {}
+        for attr in attrs:
+            per_value: Dict[str, int] = {}
+            for value, bitmap in sorted(self.bitmaps.get(attr, {}).items()):
+                if count := (mask & bitmap).bit_count():
+                    per_value[value] = count
+            counts[attr] = per_value
+        return counts
+
+    def rank_search(
+        self,
+        query: str,
+        lang: Language | str,
+        fields: Optional[List[str]] = None,
+    ) -> List[int]:
+        """Return ordinals of cards matching every query token, best first.
+
+        Query tokens match card tokens by prefix. Each match adds the
+        weight of its field, doubled for exact matches; ties keep load
+        order.
+        """
+        lang_val = lang.value if isinstance(lang, Language) else lang
+        per_field = self.token_index.get(lang_val, {})
+        fields = fields or list(SEARCH_FIELDS)
+        scores: Optional[Dict[int, int]] = None
+        for query_token in dict.fromkeys(tokenize(normalize_text(query))):
+            token_scores: Dict[int, int] = {}
+            for field in fields:
+                tokens, postings = per_field.get(field, ([], []))
+                weight = SEARCH_FIELD_WEIGHTS[field]
+                pos = bisect_left(tokens, query_token)
+                end = len(tokens)
+                while pos < end and tokens[pos].startswith(query_token):
+                    exact = tokens[pos] == query_token
+                    points = weight * 2 if exact else weight
+                    for o in postings[pos]:
+                        token_scores[o] = token_scores.get(o, 0) + points
+                    pos += 1
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {
+                    o: points + token_scores[o]
+                    for o, points in scores.items()
+                    if o in token_scores
+                }
+            if not scores:
+                break
+        if not scores:
+            return []
+        return sorted(scores, key=lambda o: (-scores[o], o))
+
+    def get_set_projections(
+        self,
+        lang: Language | str,
+    ) -> Dict[str, Projection]:
+        """Return all sets reduced to ``lang`` keyed by set ID."""
+        lang_val = _normalize_lang(lang)
+        projection = self.set_projections.get(lang_val)
+        if projection is None:
+            projection = {}
+            for set_id, s in self.sets.items():
+                projection[set_id] = filter_language(s, lang_val)
+            self.set_projections[lang_val] = projection
+        return projection
+
+    def get_card_projections(
+        self,
+        lang: Language | str,
+    ) -> Sequence[Projection]:
+        """Return all cards reduced to ``lang`` in load order.
+
+        Each projection already embeds its set and omits internal keys, so
+        responses only need to attach the image URL. The returned objects
+        are shared and must not be mutated.
+        """
+        lang_val = _normalize_lang(lang)
+        projection = self.card_projections.get(lang_val)
+        if projection is None:
+            sets = self.get_set_projections(lang_val)
+            memo: Dict[Tuple[Any, ...], Any] = {}
+            projection = []
+            for card in self.cards:
+                obj = compact(filter_language(card.source, lang_val), memo)
+                obj["set"] = sets.get(card.set_id)
+                projection.append(obj)
+            self.card_projections[lang_val] = projection
+        return projection
+
+    def get_encoded_projections(
+        self,
+        lang: Language | str,
+    ) -> ProjectionTable | None:
+        """Return the pre-encoded projections of ``lang`` if shared.
+
+        Only a dataset attached with ``use_shared`` holds the projections
+        as JSON; otherwise ``None`` is returned.
+        """
+        if self.shared is None:
+            return None
+        projections = self.get_card_projections(lang)
+        if isinstance(projections, ProjectionTable):
+            return projections
+        return None
+
+    def get_card_projection(
+        self,
+        card_id: str,
+        lang: Language | str,
+    ) -> Projection | None:
+        """Return a single card reduced to ``lang`` or ``None``."""
+        ordinal = self.ordinals.get(card_id)
+        if ordinal is None:
+            return None
+        return self.get_card_projections(lang)[ordinal]
+
+    def get_name_index(self, lang: Language | str) -> NameIndex:
+        """Return sorted normalized card names and ``id``/``name`` pairs.
+
+        Names are deduplicated so reprints appear once, pointing at the
+        first card in load order. The index is built once per language.
+        """
+        lang_val = _normalize_lang(lang)
+        index = self.name_indexes.get(lang_val)
+        if index is None:
+            entries: Dict[str, Dict[str, str]] = {}
+            projections = self.get_card_projections(lang_val)
+            for projection in projections:
+                name = projection.get("name", "")
+                key = normalize_text(str(name))
+                if key and key not in entries:
+                    entries[key] = {"id": projection["id"], "name": name}
+            keys = sorted(entries)
+            index = (keys, [entries[k] for k in keys])
+            self.name_indexes[lang_val] = index
+        return index
+
+    def suggest_names(
+        self,
+        prefix: str,
+        lang: Language | str,
+        limit: int = 10,
+    ) -> List[Dict[str, str]]:
+        """Return up to ``limit`` card names starting with ``prefix``.
+
+        A prefix that is empty after normalizing matches nothing.
+        """
+        prefix = normalize_text(prefix.strip())
+        if not prefix:
+            return []
+        keys, entries = self.get_name_index(lang)
+        start = end = bisect_left(keys, prefix)
+        stop = min(len(keys), start + limit)
+        while end < stop and keys[end].startswith(prefix):
+            end += 1
+        return entries[start:end]
+
+    def get_name_ranks(self, lang: Language | str) -> array:
+        """Return the rank of every card name in ``lang`` collation order.
+
+        Names compare by their ``normalize_text`` form, so case and accents
+        only break ties.
+        """
+        lang_val = _normalize_lang(lang)
+        ranks = self.name_ranks.get(lang_val)
+        if ranks is None:
+            projections = self.get_card_projections(lang_val)
+            names = [str(p.get("name", "")) for p in projections]
+            ranks = dense_ranks([(normalize_text(n), n) for n in names])
+            self.name_ranks[lang_val] = ranks
+        return ranks
+
+    def sort_order(
+        self,
+        spec: SortSpec,
+        lang: Language | str,
+    ) -> Tuple[array, array]:
+        """Return card ordinals sorted by ``spec`` and their positions.
+
+        The permutation covers all cards, ties keep load order. Callers
+        walk it with ``iter_sorted`` to get sorted pages of a filter result;
+        the second array maps an ordinal to its position for sorting other
+        ordinal lists. Results are cached per spec and language.
+        """
+        uses_name = any(key == "name" for key, _ in spec)
+        cache_key = (spec, _normalize_lang(lang) if uses_name else "")
+        cached = self.sort_orders.get(cache_key)
+        if cached is not None:
+            return cached
+        total = len(self.cards)
+        columns = []
+        for key, descending in spec:
+            if key == "name":
+                ranks = self.get_name_ranks(lang)
+            else:
+                ranks = self.sort_ranks[key]
+            columns.append([total - r if descending else r for r in ranks])
+        keys = list(zip(*columns, range(total)))
+        order = array("I", sorted(range(total), key=keys.__getitem__))
+        positions = array("I", bytes(4 * total))
+        for position, ordinal in enumerate(order):
+            positions[ordinal] = position
+        if len(self.sort_orders) < SORT_CACHE_SIZE:
+            self.sort_orders[cache_key] = (order, positions)
+        return order, positions
+
+    def warm(self) -> None:
+        """Build the lazy projections and name indexes for all languages."""
+        for lang in LANGUAGES:
+            self.get_card_projections(lang)
+            self.get_name_index(lang)
+            self.sort_order((("name", False),), lang)
+
+
+def source_version(paths: Optional[List[str]] = None) -> str:
+    """Return a SHA-256 digest over the contents of the data files."""
+    digest = hashlib.sha256()
+    for path in paths or SOURCE_PATHS:
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def build_dataset(
+    version: Optional[str] = None,
+    text_index: bool = True,
+) -> Dataset:
+    """Parse the JSON files in ``DATA_DIR`` and build all indexes.
+
+    Without ``text_index`` the search indexes are left empty; they are
+    built later only if the shared file has to be written.
+    """
+    parsed = []
+    for path in SOURCE_PATHS:
+        with open(path, encoding="utf-8") as f:
+            parsed.append(json.load(f))
+    raw_cards, sets, events, tournaments = parsed
+    return Dataset(
+        raw_cards,
+        sets,
+        events,
+        tournaments,
+        version or source_version(),
+        text_index,
+    )
+
+
+def write_snapshot(dataset: Dataset, path: str = SNAPSHOT_PATH) -> None:
+    """Pickle ``dataset`` to ``path`` behind a small header.
+
+    The header holds the snapshot format and the source version so that
+    ``read_snapshot`` can reject stale files without unpickling the data.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        header = {"format": SNAPSHOT_FORMAT, "version": dataset.version}
+        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(dataset, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(version: str, path: str = SNAPSHOT_PATH) -> Dataset | None:
+    """Return the dataset stored at ``path`` if it matches ``version``."""
+    try:
+        with open(path, "rb") as f:
+            header = pickle.load(f)
+            if header != {"format": SNAPSHOT_FORMAT, "version": version}:
+                logger.info("Ignoring stale data snapshot %s", path)
+                return None
+            # The snapshot holds only acyclic containers; skipping the
+            # collector while unpickling halves the load time.
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                return pickle.load(f)
+            finally:
+                if gc_enabled:
+                    gc.enable()
+    except FileNotFoundError:
+        return None
+    except Exception as exc:
+        logger.error("Could not read data snapshot %s: %s", path, exc)
+        return None
+
+
+def share_dataset(dataset: Dataset, path: str = SHARED_PATH) -> None:
+    """Attach ``dataset`` to the shared file at ``path``.
+
+    The first worker to load a new version writes the file; the others find
+    it and only map it.
+    """
+    store = attach_shared(path, dataset.version)
+    if store is None:
+        if not dataset.token_index:
+            dataset.build_text_index()
+        for lang in LANGUAGES:
+            dataset.get_card_projections(lang)
+        write_shared(
+            path,
+            dataset.version,
+            dataset.card_projections,
+            dataset.token_index,
+        )
+        store = SharedStore(path)
+    dataset.use_shared(store)
+
+
+def load_dataset() -> Dataset:
+    """Return the dataset from a matching snapshot or the JSON files."""
+    version = source_version()
+    dataset = read_snapshot(version)
+    if dataset is None:
+        dataset = build_dataset(version, text_index=not SHARED_PATH)
+    if SHARED_PATH:
+        share_dataset(dataset)
+    return dataset
+
+
+_dataset = load_dataset()
+_reload_lock = threading.Lock()
+
+# Module attributes kept for callers that predate ``Dataset``; they always
+# resolve against the current dataset.
+_LEGACY_ATTRIBUTES = {
+    "_cards": "cards",
+    "_cards_by_id": "cards_by_id",
+    "_sets": "sets",
+    "_events": "events",
+    "_tournaments": "tournaments",
+    "_search_index": "search_index",
+    "_token_index": "token_index",
+    "_bitmaps": "bitmaps",
+    "_ranges": "ranges",
+}
+
+
+# Per-value card ID sets of old callers, built from the bitmaps on access
+_LEGACY_INDEXES = {
+    "_index_by_set": "set_id",
+    "_index_by_type": "type",
+    "_index_by_rarity": "rarity",
+    "_index_by_trainer_type": "trainer_type",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LEGACY_ATTRIBUTES:
+        return getattr(_dataset, _LEGACY_ATTRIBUTES[name])
+    if name in _LEGACY_INDEXES:
+        return _dataset.card_ids_by_value(_LEGACY_INDEXES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_dataset() -> Dataset:
+    """Return the current dataset.
+
+    Request handlers should call this once and use the returned object
+    throughout, so a concurrent reload cannot mix two datasets.
+    """
+    return _dataset
+
+
+def reload_dataset() -> bool:
+    """Rebuild the dataset if the JSON files changed and swap it in.
+
+    The new dataset is fully built and warmed before the module reference
+    is replaced in a single assignment. Returns ``True`` if it changed.
+    """
+    global _dataset
+    with _reload_lock:
+        version = source_version()
+        if version == _dataset.version:
+            return False
+        dataset = read_snapshot(version) or build_dataset(
+            version, text_index=not SHARED_PATH
+        )
+        if SHARED_PATH:
+            share_dataset(dataset)
+        dataset.warm()
+        _dataset = dataset
+    logger.info("Loaded dataset %s", version[:12])
+    return True
+
+
+def filter_cards(**filters: Any) -> int:
+    """Return ``Dataset.filter_cards`` for the current dataset."""
+    return _dataset.filter_cards(**filters)
+
+
+def facet_counts(
+    mask: int,
+    attrs: Sequence[str] = FACET_ATTRIBUTES,
+) -> Dict[str, Dict[str, int]]:
+    """Return ``Dataset.facet_counts`` for the current dataset."""
+    return _dataset.facet_counts(mask, attrs)
+
+
+def rank_search(
+    query: str,
+    lang: Language | str,
+    fields: Optional[List[str]] = None,
+) -> List[int]:
+    """Return ``Dataset.rank_search`` for the current dataset."""
+    return _dataset.rank_search(query, lang, fields)
+
+
+def get_set_projections(lang: Language | str) -> Dict[str, Projection]:
+    """Return ``Dataset.get_set_projections`` for the current dataset."""
+    return _dataset.get_set_projections(lang)
+
+
+def get_card_projections(lang: Language | str) -> Sequence[Projection]:
+    """Return ``Dataset.get_card_projections`` for the current dataset."""
+    return _dataset.get_card_projections(lang)
+
+
+def get_card_projection(
+    card_id: str,
+    lang: Language | str,
+) -> Projection | None:
+    """Return ``Dataset.get_card_projection`` for the current dataset."""
+    return _dataset.get_card_projection(card_id, lang)
+
+
+def get_name_index(lang: Language | str) -> NameIndex:
+    """Return ``Dataset.get_name_index`` for the current dataset."""
+    return _dataset.get_name_index(lang)
+
+
+def suggest_names(
+    prefix: str,
+    lang: Language | str,
+    limit: int = 10,
+) -> List[Dict[str, str]]:
+    """Return ``Dataset.suggest_names`` for the current dataset."""
+    return _dataset.suggest_names(prefix, lang, limit)
+
+
+def warm_dataset() -> None:
+    """Build the lazy projections of the current dataset."""
+    _dataset.warm()
+
 
 __all__ = [
-    "_cards",
-    "_cards_by_id",
-    "_sets",
-    "_events",
-    "_tournaments",
-    "_search_index",
-    "_index_by_set",
-    "_index_by_type",
-    "_index_by_rarity",
-    "_index_by_trainer_type",
     "filter_language",
     "build_search_index",
+    "build_token_index",
+    "normalize_text",
+    "rank_search",
+    "tokenize",
+    "build_filter_bitmaps",
+    "build_cards",
+    "compact",
+    "Card",
+    "Dataset",
+    "get_dataset",
+    "reload_dataset",
+    "build_dataset",
+    "load_dataset",
+    "read_snapshot",
+    "write_snapshot",
+    "share_dataset",
+    "warm_dataset",
+    "filter_cards",
+    "facet_counts",
+    "iter_ordinals",
+    "iter_sorted",
+    "parse_sort",
+    "get_card_projections",
+    "get_card_projection",
+    "get_set_projections",
+    "get_name_index",
+    "suggest_names",
 ]
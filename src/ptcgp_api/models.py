@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel, Field
 from enum import Enum
 
@@ -15,6 +15,19 @@ class Language(str, Enum):
     ko = "ko"
 
 
+class CardView(str, Enum):
+    """Predefined field selections for card responses."""
+
+    full = "full"
+    summary = "summary"
+
+
+class ExportFormat(str, Enum):
+    """Formats of the card catalog export."""
+
+    ndjson = "ndjson"
+
+
 class VoteDirection(str, Enum):
     """Vote direction for decks."""
 
@@ -28,6 +41,27 @@ class CardList(BaseModel):
     cards: List[str] = Field(..., example=["001", "002"])
 
 
+class CardDelta(BaseModel):
+    """Card IDs to add to and remove from a list."""
+
+    add: List[str] = Field(default_factory=list, example=["001"])
+    remove: List[str] = Field(default_factory=list, example=["002"])
+
+
+class UserLists(BaseModel):
+    """Have and want lists of one user; omitted lists stay unchanged."""
+
+    user: str = Field(..., example="alice")
+    have: Optional[List[str]] = Field(None, example=["001", "002"])
+    want: Optional[List[str]] = Field(None, example=["003"])
+
+
+class UserImport(BaseModel):
+    """Payload for importing the lists of many users."""
+
+    users: List[UserLists]
+
+
 class DeckCreate(BaseModel):
     """Payload for creating a deck."""
 
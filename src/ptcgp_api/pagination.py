@@ -0,0 +1,36 @@
+"""Opaque cursor tokens for paginated endpoints."""
+
+import base64
+import binascii
+
+from fastapi import HTTPException, status
+
+TOTAL_COUNT_HEADER = "X-Total-Count"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(position: int) -> str:
+    """Return an opaque token for ``position``."""
+    raw = f"p{position}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> int:
+    """Return the position stored in ``token``.
+
+    Raises ``HTTPException`` with status 400 for malformed tokens.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii")
+        if not raw.startswith("p"):
+            raise ValueError(raw)
+        position = int(raw[1:])
+    except (ValueError, UnicodeError, binascii.Error):
+        position = -1
+    if position < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ungültiger Cursor",
+        )
+    return position
@@ -0,0 +1,66 @@
+"""Administrative routes for reloading card data."""
+
+import asyncio
+import os
+from typing import List, Tuple
+
+import structlog
+from fastapi import APIRouter, Depends, HTTPException
+
+from ..auth import verify_api_key
+from ..data import SOURCE_PATHS, get_dataset, reload_dataset
+
+logger = structlog.get_logger(__name__)
+router = APIRouter()
+
+DATA_RELOAD_INTERVAL = float(os.getenv("DATA_RELOAD_INTERVAL", "0"))
+
+
+@router.post("/admin/reload")
+async def reload_data(_: None = Depends(verify_api_key)):
+    """Reload card data if the files in ``DATA_DIR`` changed.
+
+    The new dataset is built in a worker thread; requests keep using the
+    previous one until it is swapped in. Only the process serving this
+    request reloads: with several uvicorn workers the others keep the old
+    version, and ETags alternate between versions, until their
+    ``watch_data_files`` poll sees the change. Without
+    ``DATA_RELOAD_INTERVAL`` they keep it until restarted.
+    """
+    try:
+        reloaded = await asyncio.to_thread(reload_dataset)
+    except (OSError, ValueError) as exc:
+        logger.error("Reloading data failed: %s", exc)
+        raise HTTPException(
+            status_code=500,
+            detail="Daten konnten nicht geladen werden",
+        )
+    return {"reloaded": reloaded, "version": get_dataset().version}
+
+
+def _file_stamps() -> List[Tuple[int, int] | None]:
+    """Return modification time and size of every data file."""
+    stamps: List[Tuple[int, int] | None] = []
+    for path in SOURCE_PATHS:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stamps.append(None)
+        else:
+            stamps.append((stat.st_mtime_ns, stat.st_size))
+    return stamps
+
+
+async def watch_data_files(interval: float = DATA_RELOAD_INTERVAL) -> None:
+    """Poll the data files and reload the dataset when they change."""
+    last = _file_stamps()
+    while True:
+        await asyncio.sleep(interval)
+        stamps = _file_stamps()
+        if stamps == last:
+            continue
+        last = stamps
+        try:
+            await asyncio.to_thread(reload_dataset)
+        except Exception as exc:
+            logger.error("Reloading data failed: %s", exc)
@@ -1,64 +1,387 @@
 """Routes for card data and search operations."""
 
-from fastapi import APIRouter, HTTPException, Query, Request
-from typing import Optional
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
+from itertools import islice
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+import asyncio
+import json
 import os
 import structlog
 import time
 from cachetools import TTLCache
 import httpx
 
+from ..cache import cache_headers, make_etag, not_modified, response_cache
 from ..data import (
-    _cards,
-    _cards_by_id,
-    _sets,
-    _search_index,
-    _index_by_set,
-    _index_by_type,
-    _index_by_rarity,
-    _index_by_trainer_type,
-    filter_language,
+    DATA_DIR,
+    SEARCH_FIELDS,
+    SORT_KEYS,
+    Card,
+    Dataset,
+    SortSpec,
+    get_dataset,
+    iter_ordinals,
+    iter_sorted,
+    parse_sort,
+)
+from ..models import CardList, CardView, ExportFormat, Language
+from ..pagination import (
+    NEXT_CURSOR_HEADER,
+    TOTAL_COUNT_HEADER,
+    decode_cursor,
+    encode_cursor,
 )
-from ..models import Language
 
 logger = structlog.get_logger(__name__)
 router = APIRouter()
 
 IMAGE_TIMEOUT = float(os.getenv("IMAGE_TIMEOUT", "3"))
-_image_cache: TTLCache[str, bool] = TTLCache(maxsize=256, ttl=60 * 60 * 24)
+IMAGE_CACHE_SIZE = int(os.getenv("IMAGE_CACHE_SIZE", "50000"))
+IMAGE_CONCURRENCY = int(os.getenv("IMAGE_CONCURRENCY", "16"))
+IMAGE_PREWARM_CONCURRENCY = int(os.getenv("IMAGE_PREWARM_CONCURRENCY", "4"))
+IMAGE_CACHE_TTL = 60 * 60 * 24
+_image_cache: TTLCache[str, bool] = TTLCache(IMAGE_CACHE_SIZE, IMAGE_CACHE_TTL)
+# An empty value, as in ``.env.example``, also means the default
+IMAGE_SNAPSHOT_PATH = os.getenv("IMAGE_SNAPSHOT") or os.path.join(
+    DATA_DIR, "image_availability.json"
+)
+IMAGE_PREWARM_BATCH = 500
+# ``high.webp`` URLs found to exist by ``prewarm_images``. Missing images
+# are only kept in ``_image_cache`` so they are checked again after the TTL.
+_image_availability: Set[str] = set()
+# HEAD checks currently running, shared by all requests for the same URL
+_image_checks: Dict[str, asyncio.Future] = {}
+_image_semaphore: asyncio.Semaphore | None = None
+_image_semaphore_loop: asyncio.AbstractEventLoop | None = None
+# Separate, smaller bound for the prewarm so requests do not queue behind it
+_prewarm_semaphore: asyncio.Semaphore | None = None
+_prewarm_semaphore_loop: asyncio.AbstractEventLoop | None = None
+# Upper bound for ``/cards/batch`` so one request cannot fan out unbounded
+BATCH_MAX_IDS = 500
+# Cards per chunk of ``/cards/export``; bounds memory and image checks
+EXPORT_CHUNK_SIZE = 200
+_NDJSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _image_limiter() -> asyncio.Semaphore:
+    """Return the semaphore bounding concurrent HEAD requests."""
+    global _image_semaphore, _image_semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _image_semaphore is None or _image_semaphore_loop is not loop:
+        _image_semaphore = asyncio.Semaphore(IMAGE_CONCURRENCY)
+        _image_semaphore_loop = loop
+    return _image_semaphore
+
+
+def _prewarm_limiter() -> asyncio.Semaphore:
+    """Return the semaphore bounding HEAD requests of the prewarm."""
+    global _prewarm_semaphore, _prewarm_semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _prewarm_semaphore is None or _prewarm_semaphore_loop is not loop:
+        _prewarm_semaphore = asyncio.Semaphore(IMAGE_PREWARM_CONCURRENCY)
+        _prewarm_semaphore_loop = loop
+    return _prewarm_semaphore
+
+
+async def _check_image(
+    client: httpx.AsyncClient,
+    url: str,
+    limiter: asyncio.Semaphore | None = None,
+) -> bool:
+    """Return whether ``url`` exists, retrying once, and cache the result."""
+    ok = False
+    async with limiter or _image_limiter():
+        for attempt in range(2):
+            try:
+                resp = await client.head(url, timeout=IMAGE_TIMEOUT)
+                ok = resp.status_code == 200
+                if ok:
+                    break
+            except Exception as exc:
+                logger.error("HEAD request failed for %s: %s", url, exc)
+            if attempt == 0 and not ok:
+                logger.debug("Retrying image HEAD request for %s", url)
+    _image_cache[url] = ok
+    return ok
+
+
+def _image_base(lang: Language | str, set_id: str, local_id: str) -> str:
+    lang_val = lang.value if isinstance(lang, Language) else lang
+    return f"https://assets.tcgdex.net/{lang_val}/tcgp/{set_id}/{local_id}"
+
+
+def _cached_image_url(base: str) -> str | None:
+    """Return the image URL for ``base`` if no HEAD request is needed."""
+    high = f"{base}/high.webp"
+    if os.getenv("SKIP_IMAGE_CHECKS"):
+        return high
+    cached = True if high in _image_availability else _image_cache.get(high)
+    if cached is None:
+        return None
+    return high if cached else f"{base}/low.webp"
 
 
 async def _image_url(
     client: httpx.AsyncClient, lang: Language | str, set_id: str, local_id: str
 ) -> str:
     """Return the best available image URL for a card."""
-    lang_val = lang.value if isinstance(lang, Language) else lang
-    base = f"https://assets.tcgdex.net/{lang_val}/tcgp/{set_id}/{local_id}"
+    base = _image_base(lang, set_id, local_id)
+    url = _cached_image_url(base)
+    if url is not None:
+        return url
     high = f"{base}/high.webp"
-    if os.getenv("SKIP_IMAGE_CHECKS"):
-        return high
-    cached = _image_cache.get(high)
-    if cached is not None:
-        return high if cached else f"{base}/low.webp"
-    ok = False
-    for attempt in range(2):
-        try:
-            resp = await client.head(high, timeout=IMAGE_TIMEOUT)
-            ok = resp.status_code == 200
-            if ok:
-                break
-        except Exception as exc:
-            logger.error("HEAD request failed for %s: %s", high, exc)
-        if attempt == 0 and not ok:
-            logger.debug("Retrying image HEAD request for %s", high)
-    _image_cache[high] = ok
+    check = _image_checks.get(high)
+    if check is None:
+        check = asyncio.ensure_future(_check_image(client, high))
+        _image_checks[high] = check
+        check.add_done_callback(lambda _: _image_checks.pop(high, None))
+    ok = await asyncio.shield(check)
     return high if ok else f"{base}/low.webp"
 
 
-@router.get("/cards")
-async def get_cards(
-    request: Request,
-    lang: Language = Language.de,
+async def _image_urls(
+    client: httpx.AsyncClient,
+    lang: Language | str,
+    cards: List[Card],
+) -> List[str]:
+    """Return image URLs for ``cards``, checking unknown ones concurrently."""
+    urls: List[str | None] = []
+    missing: List[Tuple[int, str, str]] = []
+    for pos, card in enumerate(cards):
+        set_id, local_id = card.set_id, card.local_id
+        urls.append(_cached_image_url(_image_base(lang, set_id, local_id)))
+        if urls[-1] is None:
+            missing.append((pos, set_id, local_id))
+    if missing:
+        resolved = await asyncio.gather(
+            *(_image_url(client, lang, s, lid) for _, s, lid in missing)
+        )
+        for (pos, _, _), url in zip(missing, resolved):
+            urls[pos] = url
+    return urls
+
+
+def load_image_snapshot(path: str = IMAGE_SNAPSHOT_PATH) -> int:
+    """Load the known existing images from ``path`` if it exists.
+
+    Older snapshots also list missing images; those are ignored.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return 0
+    except (OSError, ValueError) as exc:
+        logger.error("Could not read image snapshot %s: %s", path, exc)
+        return 0
+    urls = [url for url, ok in snapshot.items() if ok]
+    _image_availability.update(urls)
+    return len(urls)
+
+
+def save_image_snapshot(path: str = IMAGE_SNAPSHOT_PATH) -> None:
+    """Atomically write the known existing images to ``path``."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    snapshot = dict.fromkeys(sorted(_image_availability), True)
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except OSError as exc:
+        logger.error("Could not write image snapshot %s: %s", path, exc)
+
+
+async def prewarm_images(
+    client: httpx.AsyncClient,
+    path: str = IMAGE_SNAPSHOT_PATH,
+) -> int:
+    """Check ``high.webp`` availability for every card and language.
+
+    Images already known to exist from the snapshot at ``path`` or still
+    cached are skipped. Existing images are written back after every batch
+    so restarts continue where they stopped; missing ones are checked again
+    after a restart, as uploads may have happened since. Checks run under
+    their own limit of ``IMAGE_PREWARM_CONCURRENCY`` so request-path checks
+    do not wait for the prewarm. Returns the number of URLs checked.
+    """
+    load_image_snapshot(path)
+    pending = [
+        f"{_image_base(lang, card.set_id, card.local_id)}/high.webp"
+        for card in get_dataset().cards
+        for lang in Language
+    ]
+    pending = [
+        url
+        for url in pending
+        if url not in _image_availability and url not in _image_cache
+    ]
+    logger.info("Prewarming %d image URLs", len(pending))
+    limiter = _prewarm_limiter()
+    for start in range(0, len(pending), IMAGE_PREWARM_BATCH):
+        batch = pending[start : start + IMAGE_PREWARM_BATCH]  # noqa: E203
+        checks = [_check_image(client, url, limiter) for url in batch]
+        results = await asyncio.gather(*checks)
+        _image_availability.update(u for u, ok in zip(batch, results) if ok)
+        save_image_snapshot(path)
+    logger.info("Image prewarm complete")
+    return len(pending)
+
+
+# Fields returned for ``view=summary``, enough to render a card grid
+SUMMARY_FIELDS = ("id", "name", "image", "rarity")
+FIELDS_DESCRIPTION = "Komma-getrennte Kartenfelder, z. B. id,name,image"
+SORT_DESCRIPTION = (
+    f"Sortierfelder ({', '.join(SORT_KEYS)}), z. B. rarity,-hp; "
+    "- sortiert absteigend"
+)
+
+
+def _selected_fields(
+    fields: Optional[str],
+    view: CardView,
+) -> Optional[Tuple[str, ...]]:
+    """Return the requested card fields or ``None`` for full cards."""
+    if fields:
+        names = (f.strip() for f in fields.split(","))
+        return tuple(dict.fromkeys(n for n in names if n))
+    if view is CardView.summary:
+        return SUMMARY_FIELDS
+    return None
+
+
+def _sort_spec(sort: Optional[str]) -> SortSpec:
+    """Return the parsed ``sort`` parameter or raise a 400 error."""
+    if not sort:
+        return ()
+    try:
+        return parse_sort(sort)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Ungültiges Sortierfeld: {exc}",
+        )
+
+
+def _select(
+    projection: dict,
+    image: Optional[str],
+    fields: Tuple[str, ...],
+) -> dict:
+    """Return ``fields`` of the projected card in the requested order."""
+    return {
+        f: image if f == "image" else projection[f]
+        for f in fields
+        if f == "image" or f in projection
+    }
+
+
+async def _card_response(
+    client: httpx.AsyncClient,
+    lang: Language | str,
+    card: Card,
+    projection: dict,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> dict:
+    """Return the projected card with its image URL attached.
+
+    With ``fields`` only those keys are returned and the image is only
+    resolved when requested.
+    """
+    if fields is not None and "image" not in fields:
+        return _select(projection, None, fields)
+    image = await _image_url(client, lang, card.set_id, card.local_id)
+    if fields is not None:
+        return _select(projection, image, fields)
+    return {**projection, "image": image}
+
+
+async def _card_responses(
+    client: httpx.AsyncClient,
+    ds: Dataset,
+    lang: Language | str,
+    ordinals: Iterable[int],
+    fields: Optional[Tuple[str, ...]] = None,
+) -> List[dict]:
+    """Return projected cards for ``ordinals`` with image URLs attached.
+
+    ``fields`` limits the keys as in ``_card_response``.
+    """
+    ordinals = list(ordinals)
+    projections = ds.get_card_projections(lang)
+    if fields is not None and "image" not in fields:
+        return [_select(projections[o], None, fields) for o in ordinals]
+    cards = [ds.cards[o] for o in ordinals]
+    images = await _image_urls(client, lang, cards)
+    pairs = zip(ordinals, images)
+    if fields is not None:
+        return [_select(projections[o], i, fields) for o, i in pairs]
+    return [{**projections[o], "image": image} for o, image in pairs]
+
+
+async def _encoded_cards(
+    client: httpx.AsyncClient,
+    ds: Dataset,
+    lang: Language | str,
+    ordinals: Iterable[int],
+    fields: Optional[Tuple[str, ...]] = None,
+) -> List[bytes] | None:
+    """Return full cards for ``ordinals`` as JSON from the shared file.
+
+    The stored projection JSON gets the ``image`` key appended without
+    being decoded. ``None`` means the dataset is not shared or ``fields``
+    limits the keys; callers then use ``_card_responses``.
+    """
+    if fields is not None:
+        return None
+    projections = ds.get_encoded_projections(lang)
+    if projections is None:
+        return None
+    ordinals = list(ordinals)
+    cards = [ds.cards[o] for o in ordinals]
+    images = await _image_urls(client, lang, cards)
+    return [
+        b'%s,"image":%s}' % (projections.encoded(o)[:-1], _encode(image))
+        for o, image in zip(ordinals, images)
+    ]
+
+
+def _encode(content: Any) -> bytes:
+    """Return ``content`` as compact UTF-8 JSON like ``JSONResponse``."""
+    return _NDJSON_ENCODER.encode(content).encode("utf-8")
+
+
+def _json_list(items: List[bytes]) -> bytes:
+    """Return a JSON array of the already encoded ``items``."""
+    return b"[" + b",".join(items) + b"]"
+
+
+def _json_response(body: bytes, response: Response) -> Response:
+    """Return encoded JSON with the headers set on ``response``."""
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers=dict(response.headers),
+    )
+
+
+def card_filters(
     set_id: Optional[str] = None,
     type_: Optional[str] = Query(None, alias="type"),
     trainer_type: Optional[str] = Query(None, alias="trainerType"),
@@ -74,101 +397,143 @@ async def get_cards(
     weakness: Optional[str] = None,
     retreat_min: Optional[int] = None,
     retreat_max: Optional[int] = None,
-    limit: Optional[int] = None,
-    offset: int = 0,
+) -> Dict[str, Any]:
+    """Collect the card filter query parameters for ``filter_cards``."""
+    return {
+        "set_id": set_id,
+        "type_": type_,
+        "trainer_type": trainer_type,
+        "rarity": rarity,
+        "category": category,
+        "evolve_from": evolve_from,
+        "stage": stage,
+        "booster": booster,
+        "illustrator": illustrator,
+        "suffix": suffix,
+        "weakness": weakness,
+        "hp_min": hp_min,
+        "hp_max": hp_max,
+        "retreat_min": retreat_min,
+        "retreat_max": retreat_max,
+    }
+
+
+@router.get("/cards")
+async def get_cards(
+    request: Request,
+    lang: Language = Language.de,
+    filters: Dict[str, Any] = Depends(card_filters),
+    sort: Optional[str] = Query(None, description=SORT_DESCRIPTION),
+    limit: Optional[int] = Query(None, ge=0),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(
+        None,
+        description="Token aus dem Header X-Next-Cursor der Vorseite",
+    ),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    view: CardView = CardView.full,
 ):
     """Return cards filtered by query parameters.
 
-    The initial filtering by ``set_id``, ``type`` and ``rarity`` uses
-    pre-built indexes for ``O(k)`` lookups. Remaining filters are applied
-    with an ``O(n)`` scan over the candidate set.
+    All filters are resolved with bitmap intersections over card ordinals
+    (see ``filter_cards``), so the matching cards are known in load order
+    before any response object is built. Only the requested page is
+    materialized; ``X-Total-Count`` carries the number of matches and
+    ``X-Next-Cursor`` a token for the following page when ``limit`` is set.
+    The ETag covers the dataset version and all query parameters; encoded
+    pages are kept in the response cache with precompressed variants.
+    ``fields`` or ``view=summary`` limit the keys of every card.
+
+    With ``sort`` the page is read from a presorted permutation of all
+    cards (see ``Dataset.sort_order``) instead of sorting the matches.
     """
     start_ts = time.perf_counter() if os.getenv("PROFILE_FILTERS") else None
+    set_id = filters["set_id"]
     logger.info("get_cards request lang=%s set_id=%s", lang, set_id)
 
-    candidate_ids: Optional[set] = None
-    if set_id:
-        candidate_ids = set(_index_by_set.get(set_id, set()))
-    if type_:
-        ids = _index_by_type.get(type_, set())
-        candidate_ids = ids if candidate_ids is None else candidate_ids & ids
-    if trainer_type:
-        ids = _index_by_trainer_type.get(trainer_type, set())
-        candidate_ids = ids if candidate_ids is None else candidate_ids & ids
-    if rarity:
-        ids = _index_by_rarity.get(rarity, set())
-        candidate_ids = ids if candidate_ids is None else candidate_ids & ids
-
-    search_space = (
-        _cards
-        if candidate_ids is None
-        else [c for c in _cards if c["id"] in candidate_ids]
-    )
-
-    result = []
-    for card in search_space:
-        if category and card.get("category") != category:
-            continue
-        if stage and card.get("stage") != stage:
-            continue
-        if evolve_from:
-            evo = card.get("evolveFrom")
-            if not evo:
-                continue
-            names = evo.values() if isinstance(evo, dict) else [evo]
-            if not any(
-                str(evolve_from).lower() == str(n).lower() for n in names
-            ):  # noqa: E501
-                continue
-        if booster and booster not in card.get("boosters", []):
-            continue
-        if illustrator and card.get("illustrator") != illustrator:
-            continue
-        if suffix and card.get("suffix") != suffix:
-            continue
-        if hp_min is not None and int(card.get("hp", 0)) < hp_min:
-            continue
-        if hp_max is not None and int(card.get("hp", 0)) > hp_max:
-            continue
-        if weakness:
-            weak_types = [w.get("type") for w in card.get("weaknesses", [])]
-            if weakness not in weak_types:
-                continue
-        if (
-            retreat_min is not None
-            and int(card.get("retreat", 0)) < retreat_min  # noqa: E501
-        ):
-            continue
-        if (
-            retreat_max is not None
-            and int(card.get("retreat", 0)) > retreat_max  # noqa: E501
-        ):
-            continue
+    ds = get_dataset()
+    params = tuple(sorted(request.query_params.multi_items()))
+    key = ("cards", ds.version, params)
+    cached = response_cache.get(key, request, weak=True)
+    if cached is not None:
+        return cached
+    spec = _sort_spec(sort)
+    mask = ds.filter_cards(**filters)
+    headers = {TOTAL_COUNT_HEADER: str(mask.bit_count())}
+    stop = None if limit is None else offset + limit
+    if spec:
+        # Walk the presorted permutation; the cursor is a position in it
+        order, _ = ds.sort_order(spec, lang)
+        start = 0 if cursor is None else decode_cursor(cursor) + 1
+        walk = iter_sorted(mask, order, start)
+        items = list(islice(walk, offset, None if stop is None else stop + 1))
+        more = stop is not None and len(items) > limit
+        items = items[:limit]
+        page = [ordinal for _, ordinal in items]
+        last = items[-1][0] if items else None
+    else:
+        if cursor is not None:
+            after = decode_cursor(cursor) + 1
+            mask = mask >> after << after
+        page = list(islice(iter_ordinals(mask), offset, stop))
+        more = bool(page) and bool(mask >> (page[-1] + 1))
+        last = page[-1] if page else None
+    if limit is not None and more and last is not None:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(last)
 
-        c = card.copy()
-        c["set"] = _sets.get(c["set_id"])
-        c["image"] = await _image_url(
-            request.app.state.http_client, lang, c["set_id"], c["_local_id"]
-        )
-        del c["_local_id"]
-        result.append(filter_language(c, lang))
+    client = request.app.state.http_client
+    selected = _selected_fields(fields, view)
+    encoded = await _encoded_cards(client, ds, lang, page, selected)
+    if encoded is not None:
+        content: Any = _json_list(encoded)
+    else:
+        content = await _card_responses(client, ds, lang, page, selected)
+    result = response_cache.store(key, content, weak=True, headers=headers)
 
-    if offset:
-        result = result[offset:]
-    if limit is not None:
-        result = result[:limit]
     if start_ts is not None:
         logger.info(
             "get_cards filtered %d cards in %.4fs",
-            len(result),
+            len(page),
             time.perf_counter() - start_ts,
         )
     return result
 
 
+# Facet names in responses match the query parameters of ``/cards``
+_FACET_PARAMS = {"trainer_type": "trainerType"}
+
+
+@router.get("/cards/facets")
+def get_card_facets(
+    request: Request,
+    filters: Dict[str, Any] = Depends(card_filters),
+):
+    """Return counts per facet value for cards matching the filters.
+
+    Accepts the filters of ``/cards``. Counts come from the filter bitmaps,
+    so no card is materialized.
+    """
+    ds = get_dataset()
+    params = tuple(sorted(request.query_params.multi_items()))
+    etag = make_etag(("facets", ds.version, params))
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    mask = ds.filter_cards(**filters)
+    facets = {
+        _FACET_PARAMS.get(attr, attr): counts
+        for attr, counts in ds.facet_counts(mask).items()
+    }
+    return JSONResponse(
+        {"total": mask.bit_count(), "facets": facets},
+        headers=cache_headers(etag),
+    )
+
+
 @router.get("/cards/search")
 async def search_cards(
     request: Request,
+    response: Response,
     q: str,
     lang: Language = Language.de,
     fields: Optional[str] = Query(
@@ -177,40 +542,180 @@ async def search_cards(
             "Komma-getrennte Liste der Felder: name, abilities, attacks"
         ),  # noqa: E501
     ),
+    limit: Optional[int] = Query(None, ge=0),
+    offset: int = Query(0, ge=0),
+    select: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    view: CardView = CardView.full,
+    sort: Optional[str] = Query(None, description=SORT_DESCRIPTION),
 ):
-    """Search cards by query string and optional fields."""
+    """Search cards by query string and optional fields.
+
+    Matches come from the inverted token index and are ranked by score,
+    with name matches weighted above abilities and attacks. ``fields``
+    names the searched fields, so returned card fields are chosen with
+    ``select`` or ``view=summary``. ``sort`` replaces the ranking.
+    """
     logger.info("search_cards q=%s lang=%s", q, lang)
-    results = []
-    q_lower = q.lower()
     requested = None
     if fields:
-        requested = [
-            f.strip()
-            for f in fields.split(",")
-            if f.strip() in {"name", "abilities", "attacks"}
-        ]
-    for card in _cards:
-        search_data = _search_index.get(card["id"], {}).get(
-            lang.value if isinstance(lang, Language) else lang,
-            {},
+        names = [f.strip() for f in fields.split(",")]
+        requested = [f for f in names if f in SEARCH_FIELDS]
+    spec = _sort_spec(sort)
+    ds = get_dataset()
+    ranked = ds.rank_search(q, lang, requested)
+    if spec:
+        _, positions = ds.sort_order(spec, lang)
+        ranked.sort(key=positions.__getitem__)
+    response.headers[TOTAL_COUNT_HEADER] = str(len(ranked))
+    stop = None if limit is None else offset + limit
+
+    client = request.app.state.http_client
+    selected = _selected_fields(select, view)
+    page = ranked[offset:stop]
+    encoded = await _encoded_cards(client, ds, lang, page, selected)
+    if encoded is not None:
+        return _json_response(_json_list(encoded), response)
+    return await _card_responses(client, ds, lang, page, selected)
+
+
+@router.get("/cards/suggest")
+def suggest_cards(
+    q: str = Query(..., min_length=1),
+    lang: Language = Language.de,
+    limit: int = Query(10, ge=1, le=50),
+):
+    """Return card names starting with ``q`` for type-ahead inputs.
+
+    Lookups are a bisect into a presorted name array; the response is
+    encoded directly without per-card objects.
+    """
+    return JSONResponse(get_dataset().suggest_names(q, lang, limit))
+
+
+async def _batch_content(
+    request: Request,
+    ids: Iterable[str],
+    lang: Language,
+    fields: Optional[str],
+    view: CardView,
+) -> Any:
+    """Return the cards for ``ids`` in request order and the unknown ids.
+
+    Repeated ids are returned once. All images are resolved concurrently.
+    Shared datasets yield the encoded JSON instead of a dict.
+    """
+    ids = list(dict.fromkeys(i.strip() for i in ids if i.strip()))
+    if len(ids) > BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Höchstens {BATCH_MAX_IDS} Karten pro Anfrage",
         )
-        text = (
-            search_data.get("full", "")
-            if not requested
-            else " ".join(search_data.get(f, "") for f in requested)
+    ds = get_dataset()
+    ordinals = [ds.ordinals[i] for i in ids if i in ds.ordinals]
+    missing = [i for i in ids if i not in ds.ordinals]
+    client = request.app.state.http_client
+    selected = _selected_fields(fields, view)
+    encoded = await _encoded_cards(client, ds, lang, ordinals, selected)
+    if encoded is not None:
+        return b'{"cards":%s,"missing":%s}' % (
+            _json_list(encoded),
+            _encode(missing),
         )
-        if q_lower in text:
-            c = card.copy()
-            c["set"] = _sets.get(c["set_id"])
-            c["image"] = await _image_url(
-                request.app.state.http_client,
-                lang,
-                c["set_id"],
-                c["_local_id"],
-            )
-            del c["_local_id"]
-            results.append(filter_language(c, lang))
-    return results
+    cards = await _card_responses(client, ds, lang, ordinals, selected)
+    return {"cards": cards, "missing": missing}
+
+
+@router.get("/cards/batch")
+async def get_cards_batch(
+    request: Request,
+    ids: List[str] = Query(
+        ...,
+        description="Karten-IDs, komma-getrennt oder wiederholt",
+    ),
+    lang: Language = Language.de,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    view: CardView = CardView.full,
+):
+    """Return several cards by ID in one request.
+
+    ``missing`` lists the ids that do not exist; use ``POST /cards/batch``
+    for lists that do not fit into a URL.
+    """
+    ds = get_dataset()
+    params = tuple(sorted(request.query_params.multi_items()))
+    key = ("batch", ds.version, params)
+    cached = response_cache.get(key, request, weak=True)
+    if cached is not None:
+        return cached
+    split = [i for value in ids for i in value.split(",")]
+    content = await _batch_content(request, split, lang, fields, view)
+    return response_cache.store(key, content, weak=True)
+
+
+@router.post("/cards/batch")
+async def post_cards_batch(
+    request: Request,
+    response: Response,
+    payload: CardList,
+    lang: Language = Language.de,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    view: CardView = CardView.full,
+):
+    """Return the cards listed in the body, like ``GET /cards/batch``."""
+    ids = payload.cards
+    content = await _batch_content(request, ids, lang, fields, view)
+    if isinstance(content, bytes):
+        return _json_response(content, response)
+    return content
+
+
+async def _export_ndjson(
+    client: httpx.AsyncClient,
+    ds: Dataset,
+    lang: Language,
+    fields: Optional[Tuple[str, ...]],
+) -> AsyncIterator[bytes]:
+    """Yield all cards of ``ds`` as NDJSON, one chunk of lines at a time."""
+    total = len(ds.cards)
+    for start in range(0, total, EXPORT_CHUNK_SIZE):
+        ordinals = range(start, min(start + EXPORT_CHUNK_SIZE, total))
+        encoded = await _encoded_cards(client, ds, lang, ordinals, fields)
+        if encoded is not None:
+            yield b"".join(card + b"\n" for card in encoded)
+            continue
+        cards = await _card_responses(client, ds, lang, ordinals, fields)
+        lines = "".join(_NDJSON_ENCODER.encode(c) + "\n" for c in cards)
+        yield lines.encode("utf-8")
+
+
+@router.get("/cards/export")
+async def export_cards(
+    request: Request,
+    lang: Language = Language.de,
+    format: ExportFormat = ExportFormat.ndjson,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    view: CardView = CardView.full,
+):
+    """Stream the complete card catalog, one JSON object per line.
+
+    Cards are encoded in chunks of ``EXPORT_CHUNK_SIZE``, so memory use
+    does not grow with the catalog and other requests are served between
+    chunks. The export uses the dataset current at its start throughout.
+    """
+    ds = get_dataset()
+    params = tuple(sorted(request.query_params.multi_items()))
+    etag = make_etag(("export", ds.version, params), weak=True)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    logger.info("export_cards lang=%s format=%s", lang, format)
+    client = request.app.state.http_client
+    selected = _selected_fields(fields, view)
+    return StreamingResponse(
+        _export_ndjson(client, ds, lang, selected),
+        media_type="application/x-ndjson",
+        headers=cache_headers(etag),
+    )
 
 
 @router.get("/cards/{card_id}")
@@ -218,14 +723,24 @@ async def get_card(
     request: Request,
     card_id: str,
     lang: Language = Language.de,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    view: CardView = CardView.full,
 ):
-    card = _cards_by_id.get(card_id)
+    """Return a single card by ID."""
+    ds = get_dataset()
+    selected = _selected_fields(fields, view)
+    key = ("card", ds.version, card_id, lang.value, selected)
+    cached = response_cache.get(key, request, weak=True)
+    if cached is not None:
+        return cached
+    card = ds.cards_by_id.get(card_id)
     if card is None:
         raise HTTPException(status_code=404, detail="Karte nicht gefunden")
-    c = card.copy()
-    c["set"] = _sets.get(c["set_id"])
-    c["image"] = await _image_url(
-        request.app.state.http_client, lang, c["set_id"], c["_local_id"]
+    result = await _card_response(
+        request.app.state.http_client,
+        lang,
+        card,
+        ds.get_card_projection(card_id, lang),
+        selected,
     )
-    del c["_local_id"]
-    return filter_language(c, lang)
+    return response_cache.store(key, result, weak=True)
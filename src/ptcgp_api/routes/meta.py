@@ -1,34 +1,56 @@
 """Metadata routes for sets, events and tournaments."""
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 
-from ..data import _sets, _events, _tournaments, filter_language
+from ..cache import response_cache
+from ..data import get_dataset
 
 router = APIRouter()
 
 
 @router.get("/sets")
-def get_sets(lang: str = "de"):
+def get_sets(request: Request, lang: str = "de"):
     """Return all sets in the requested language."""
-    return [filter_language(s, lang) for s in _sets.values()]
+    ds = get_dataset()
+    key = ("sets", ds.version, lang)
+    cached = response_cache.get(key, request)
+    if cached is not None:
+        return cached
+    sets = list(ds.get_set_projections(lang).values())
+    return response_cache.store(key, sets)
 
 
 @router.get("/sets/{set_id}")
-def get_set(set_id: str, lang: str = "de"):
+def get_set(request: Request, set_id: str, lang: str = "de"):
     """Return a single set by ID."""
-    s = _sets.get(set_id)
+    ds = get_dataset()
+    key = ("set", ds.version, set_id, lang)
+    cached = response_cache.get(key, request)
+    if cached is not None:
+        return cached
+    s = ds.get_set_projections(lang).get(set_id)
     if s is None:
         raise HTTPException(status_code=404, detail="Set nicht gefunden")
-    return filter_language(s, lang)
+    return response_cache.store(key, s)
 
 
 @router.get("/events")
-def get_events():
+def get_events(request: Request):
     """Return known events."""
-    return _events
+    ds = get_dataset()
+    key = ("events", ds.version)
+    cached = response_cache.get(key, request)
+    if cached is not None:
+        return cached
+    return response_cache.store(key, ds.events)
 
 
 @router.get("/tournaments")
-def get_tournaments():
+def get_tournaments(request: Request):
     """Return tournament information."""
-    return _tournaments
+    ds = get_dataset()
+    key = ("tournaments", ds.version)
+    cached = response_cache.get(key, request)
+    if cached is not None:
+        return cached
+    return response_cache.store(key, ds.tournaments)
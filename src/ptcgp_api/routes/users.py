@@ -1,31 +1,206 @@
 """Routes for user trading, decks and groups."""
 
-from fastapi import APIRouter, HTTPException, Query
-from typing import Dict
+from fastapi import APIRouter, HTTPException, Query, Response
+from typing import Dict, Iterable, List, Optional
+import asyncio
+import sqlite3
+import threading
 import structlog
 
 from fastapi import Depends
 
 from ..models import (
+    CardDelta,
     CardList,
     DeckCreate,
     Deck,
     GroupCreate,
     Group,
     JoinGroupRequest,
+    UserImport,
     VoteDirection,
 )
 from ..auth import verify_api_key
+from ..data import RARITY_ORDER, get_dataset
+from ..pagination import (
+    NEXT_CURSOR_HEADER,
+    TOTAL_COUNT_HEADER,
+    decode_cursor,
+    encode_cursor,
+)
+from ..storage import USER_DB_FLUSH_INTERVAL, Records, open_storage
+from ..trades import TradeIndex
 
 logger = structlog.get_logger(__name__)
-router = APIRouter()
 
-# In-memory stores for demo purposes
+# In-memory records; changes are persisted through ``_storage``
 _users: Dict[str, Dict[str, set]] = {}
 _decks: Dict[str, Dict] = {}
-_deck_counter = 1
 _groups: Dict[str, Dict] = {}
-_group_counter = 1
+_storage = open_storage()
+_loaded = False
+# Held while records change or changes of other workers are merged
+_store_lock = threading.RLock()
+# Inverted have/want lists of ``_users``, updated with every list change
+_trade_index = TradeIndex()
+
+# "added"/"removed" -> card IDs changed by an update
+Changes = Dict[str, List[str]]
+
+
+def _apply_records(records: Records | None) -> None:
+    """Merge records read from the storage backend into memory."""
+    if records is None:
+        return
+    for user_id, user in records.users.items():
+        for kind in ("have", "want"):
+            current = _users.get(user_id, {}).get(kind, set())
+            new = user[kind]
+            _apply_cards(user_id, kind, new - current, current - new)
+    _decks.update(records.decks)
+    _groups.update(records.groups)
+
+
+def load_store() -> None:
+    """Load the stored records on first use."""
+    global _loaded
+    if _loaded:
+        return
+    with _store_lock:
+        if not _loaded:
+            _apply_records(_storage.load_changes())
+            _loaded = True
+            logger.info(
+                "Loaded %d users, %d decks and %d groups",
+                len(_users),
+                len(_decks),
+                len(_groups),
+            )
+
+
+def sync_store() -> None:
+    """Write pending changes and pick up those of other workers."""
+    _storage.flush()
+    with _store_lock:
+        _apply_records(_storage.load_changes())
+
+
+def _publish() -> None:
+    """Write queued changes so other workers see new records right away.
+
+    Failures, e.g. while another worker holds the write lock, are only
+    logged; the changes stay queued for ``flush_store``.
+    """
+    try:
+        _storage.flush()
+    except sqlite3.Error as exc:
+        logger.warning("Writing user data failed, retrying later: %s", exc)
+
+
+def _merge_changes() -> None:
+    """Pick up changes of other workers without writing our own.
+
+    Unflushed local changes are kept; see ``Storage.load_changes``.
+    """
+    if _storage.persistent:
+        with _store_lock:
+            _apply_records(_storage.load_changes())
+
+
+def close_store() -> None:
+    """Write pending changes and close the storage backend."""
+    _storage.close()
+
+
+async def flush_store(interval: float = USER_DB_FLUSH_INTERVAL) -> None:
+    """Periodically run ``sync_store`` in a worker thread."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(sync_store)
+        except Exception as exc:
+            logger.error("Flushing user data failed: %s", exc)
+
+
+def _tables() -> Dict[str, Dict[str, Dict]]:
+    return {"users": _users, "decks": _decks, "groups": _groups}
+
+
+def _get_record(table: str, key: str) -> Dict | None:
+    """Return a user, deck or group by ID.
+
+    Records created by other workers may not have been merged yet, so a
+    miss merges their changes before giving up.
+    """
+    found = _tables()[table].get(key)
+    if found is None and _storage.persistent:
+        _merge_changes()
+        found = _tables()[table].get(key)
+    return found
+
+
+async def _require_store() -> None:
+    """Wait until the stored records are loaded."""
+    if not _loaded:
+        await asyncio.to_thread(load_store)
+
+
+router = APIRouter(dependencies=[Depends(_require_store)])
+
+
+def _apply_cards(
+    user_id: str,
+    kind: str,
+    add: Iterable[str] = (),
+    remove: Iterable[str] = (),
+) -> Changes:
+    """Add and remove cards of the ``kind`` list of ``user_id`` in place.
+
+    Only the given cards are touched; the changed IDs are returned.
+    """
+    index = _trade_index
+    user = _users.setdefault(user_id, {"have": set(), "want": set()})
+    cards = user[kind]
+    removed = sorted(set(remove) & cards)
+    cards.difference_update(removed)
+    added = sorted(set(add) - cards)
+    cards.update(added)
+    index.apply(user_id, kind, added, removed)
+    if added or removed:
+        index.refresh(user_id, user["have"], user["want"])
+    return {"added": added, "removed": removed}
+
+
+def _change_cards(
+    user_id: str,
+    kind: str,
+    add: Iterable[str] = (),
+    remove: Iterable[str] = (),
+) -> Changes:
+    """Like ``_apply_cards``, but also persist the changes."""
+    with _store_lock:
+        new_user = user_id not in _users
+        changes = _apply_cards(user_id, kind, add, remove)
+        if changes["added"] or changes["removed"]:
+            _storage.change_cards(user_id, kind, **changes)
+        elif new_user:
+            _storage.add_user(user_id)
+    return changes
+
+
+def _replace_cards(user_id: str, kind: str, cards: List[str]) -> Changes:
+    """Replace the ``kind`` list of ``user_id``, returning the changes."""
+    with _store_lock:
+        current = _users.get(user_id, {}).get(kind, set())
+        new = set(cards)
+        return _change_cards(user_id, kind, new - current, current - new)
+
+
+def _set_cards(user_id: str, kind: str, cards: List[str]) -> Dict[str, set]:
+    """Replace the ``kind`` list of ``user_id`` and return the user."""
+    with _store_lock:
+        _replace_cards(user_id, kind, cards)
+        return _users[user_id]
 
 
 @router.post("/users/{user_id}/have")
@@ -35,8 +210,7 @@ def set_have(
     _: None = Depends(verify_api_key),
 ):
     """Store the cards a user owns."""
-    user = _users.setdefault(user_id, {"have": set(), "want": set()})
-    user["have"] = set(payload.cards)
+    user = _set_cards(user_id, "have", payload.cards)
     return {"user": user_id, "have": sorted(user["have"])}
 
 
@@ -47,15 +221,64 @@ def set_want(
     _: None = Depends(verify_api_key),
 ):
     """Store the cards a user is looking for."""
-    user = _users.setdefault(user_id, {"have": set(), "want": set()})
-    user["want"] = set(payload.cards)
+    user = _set_cards(user_id, "want", payload.cards)
     return {"user": user_id, "want": sorted(user["want"])}
 
 
+@router.patch("/users/{user_id}/have")
+def change_have(
+    user_id: str,
+    payload: CardDelta,
+    _: None = Depends(verify_api_key),
+):
+    """Add and remove single cards a user owns.
+
+    Only the IDs that actually changed are returned.
+    """
+    changes = _change_cards(user_id, "have", payload.add, payload.remove)
+    return {"user": user_id, **changes}
+
+
+@router.patch("/users/{user_id}/want")
+def change_want(
+    user_id: str,
+    payload: CardDelta,
+    _: None = Depends(verify_api_key),
+):
+    """Add and remove single cards a user is looking for.
+
+    Only the IDs that actually changed are returned.
+    """
+    changes = _change_cards(user_id, "want", payload.add, payload.remove)
+    return {"user": user_id, **changes}
+
+
+@router.post("/users/import")
+def import_users(
+    payload: UserImport,
+    _: None = Depends(verify_api_key),
+):
+    """Replace the lists of many users in one request.
+
+    Lists missing from an entry stay unchanged. For every user the added
+    and removed IDs per list are returned.
+    """
+    result = []
+    for entry in payload.users:
+        changes: Dict[str, object] = {"user": entry.user}
+        for kind in ("have", "want"):
+            cards = getattr(entry, kind)
+            if cards is not None:
+                changes[kind] = _replace_cards(entry.user, kind, cards)
+        result.append(changes)
+    logger.info("Imported lists of %d users", len(result))
+    return {"users": result}
+
+
 @router.get("/users/{user_id}")
 def get_user(user_id: str):
     """Return the stored card lists for a single user."""
-    user = _users.get(user_id)
+    user = _get_record("users", user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Benutzer nicht gefunden")
     return {
@@ -67,44 +290,112 @@ def get_user(user_id: str):
 
 @router.get("/trades/matches")
 def trade_matches():
-    """Return simple trade suggestions between all known users."""
-    matches = []
-    ids = list(_users.keys())
-    for i, a in enumerate(ids):
-        for b in ids[i + 1 :]:  # noqa: E203
-            ua = _users[a]
-            ub = _users[b]
-            if ua["have"] & ub["want"] and ub["have"] & ua["want"]:
-                matches.append({"user_a": a, "user_b": b})
-    return matches
+    """Return simple trade suggestions between all known users.
+
+    The trade index keeps the match graph up to date on every list change
+    and caches the pair list, so reads cost no more than the result. Pairs
+    are listed once, in the order the users were first stored.
+    """
+    return _trade_index.pairs()
+
+
+def _card_weights(card_ids: List[str]) -> Dict[str, int]:
+    """Weight cards by rarity, 1 for ``None`` up to 11 for ``Crown``."""
+    ds = get_dataset()
+    rank = {rarity: i + 1 for i, rarity in enumerate(RARITY_ORDER)}
+    weights = {}
+    for card_id in card_ids:
+        card = ds.cards_by_id.get(card_id)
+        weights[card_id] = rank.get(card.rarity, 1) if card else 1
+    return weights
+
+
+@router.get("/users/{user_id}/matches")
+def user_matches(
+    user_id: str,
+    response: Response,
+    weighted: bool = Query(False, description="Seltene Karten höher werten"),
+    limit: Optional[int] = Query(None, ge=0),
+    cursor: Optional[str] = Query(
+        None,
+        description="Token aus dem Header X-Next-Cursor der Vorseite",
+    ),
+):
+    """Return the trade partners of one user, best first.
+
+    Only the posting lists of the user's own cards are read from the trade
+    index. Partners are ranked by the number of one-for-one trades, i.e.
+    the smaller of the card counts each side can give; with ``weighted``
+    every card counts with its rarity weight. Ties keep the order in which
+    users first appeared in the trade index. The cursor is a position in
+    the ranking.
+    """
+    user = _get_record("users", user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="Benutzer nicht gefunden")
+    index = _trade_index
+    candidates = index.candidates(user_id, user["have"], user["want"])
+    weights: Dict[str, int] = {}
+    if weighted:
+        cards = {c for pair in candidates.values() for c in pair[0] + pair[1]}
+        weights = _card_weights(sorted(cards))
+    ranked = []
+    for partner, (give, receive) in candidates.items():
+        if weighted:
+            score = min(
+                sum(weights[card_id] for card_id in give),
+                sum(weights[card_id] for card_id in receive),
+            )
+        else:
+            score = min(len(give), len(receive))
+        ranked.append((-score, index.order(partner), partner))
+    ranked.sort()
+
+    response.headers[TOTAL_COUNT_HEADER] = str(len(ranked))
+    start = 0 if cursor is None else decode_cursor(cursor) + 1
+    stop = None if limit is None else start + limit
+    page = ranked[start:stop]
+    if stop is not None and stop < len(ranked) and page:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(stop - 1)
+    return [
+        {
+            "user": partner,
+            "score": -score,
+            "give": candidates[partner][0],
+            "receive": candidates[partner][1],
+        }
+        for score, _, partner in page
+    ]
 
 
 @router.post("/decks")
 def create_deck(deck: DeckCreate, _: None = Depends(verify_api_key)) -> Deck:
     """Create a new deck and return it."""
-    global _deck_counter
-    deck_id = str(_deck_counter)
-    _deck_counter += 1
-    _decks[deck_id] = {
-        "id": deck_id,
-        "name": deck.name,
-        "cards": deck.cards,
-        "votes": 0,
-    }
+    deck_id = _storage.next_id("decks")
+    with _store_lock:
+        _decks[deck_id] = {
+            "id": deck_id,
+            "name": deck.name,
+            "cards": deck.cards,
+            "votes": 0,
+        }
+        _storage.add_deck(_decks[deck_id])
+    _publish()
     logger.info("Created deck %s with %d cards", deck_id, len(deck.cards))
     return _decks[deck_id]
 
 
 @router.get("/decks")
 def list_decks():
-    """List all created decks."""
+    """List all created decks, including those of other workers."""
+    _merge_changes()
     return list(_decks.values())
 
 
 @router.get("/decks/{deck_id}")
 def get_deck(deck_id: str):
     """Return a deck by its ID."""
-    deck = _decks.get(deck_id)
+    deck = _get_record("decks", deck_id)
     if not deck:
         raise HTTPException(status_code=404, detail="Deck nicht gefunden")
     return deck
@@ -116,13 +407,13 @@ def vote_deck(
     vote: VoteDirection = Query(..., description="up or down"),
     _: None = Depends(verify_api_key),
 ) -> Deck:
-    deck = _decks.get(deck_id)
-    if not deck:
-        raise HTTPException(status_code=404, detail="Deck nicht gefunden")
-    if vote == VoteDirection.up:
-        deck["votes"] += 1
-    elif vote == VoteDirection.down:
-        deck["votes"] -= 1
+    with _store_lock:
+        deck = _get_record("decks", deck_id)
+        if not deck:
+            raise HTTPException(status_code=404, detail="Deck nicht gefunden")
+        delta = 1 if vote == VoteDirection.up else -1
+        deck["votes"] += delta
+        _storage.vote(deck_id, delta)
     return deck
 
 
@@ -133,14 +424,15 @@ def create_group(
 ) -> Group:
     """Create a new group and return it."""
 
-    global _group_counter
-    group_id = str(_group_counter)
-    _group_counter += 1
-    _groups[group_id] = {
-        "id": group_id,
-        "name": group.name,
-        "members": [],
-    }
+    group_id = _storage.next_id("groups")
+    with _store_lock:
+        _groups[group_id] = {
+            "id": group_id,
+            "name": group.name,
+            "members": [],
+        }
+        _storage.add_group(_groups[group_id])
+    _publish()
     return _groups[group_id]
 
 
@@ -152,17 +444,19 @@ def join_group(
 ) -> Group:
     """Add a user to a group."""
 
-    group = _groups.get(group_id)
+    with _store_lock:
+        group = _get_record("groups", group_id)
+        if group and payload.user_id not in group.get("members", []):
+            group["members"].append(payload.user_id)
+            _storage.join_group(group_id, payload.user_id)
     if not group:
         raise HTTPException(status_code=404, detail="Gruppe nicht gefunden")
-    if payload.user_id not in group.get("members", []):
-        group["members"].append(payload.user_id)
     return group
 
 
 @router.get("/groups/{group_id}")
 def get_group(group_id: str):
-    group = _groups.get(group_id)
+    group = _get_record("groups", group_id)
     if not group:
         raise HTTPException(status_code=404, detail="Gruppe nicht gefunden")
     return group
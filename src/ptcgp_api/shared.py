@@ -0,0 +1,200 @@
+"""Read-only memory-mapped dataset shared by all worker processes.
+
+The file holds the per-language card projections as UTF-8 JSON blobs and
+the inverted token index as string tables plus ``uint32`` posting arrays.
+Every worker maps the same file, so these structures live once in the page
+cache instead of once per process.
+
+Layout (little endian)::
+
+    b"PTCGPSHM" | u32 header length | JSON header | 8-byte aligned sections
+
+The header stores the dataset version and the offset and length of every
+section.
+"""
+
+import json
+import mmap
+import os
+import struct
+from array import array
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+MAGIC = b"PTCGPSHM"
+_LENGTH = struct.Struct("<I")
+
+
+class OffsetTable(Sequence[Any]):
+    """Variable length items stored as one blob plus ``n + 1`` offsets."""
+
+    def __init__(self, offsets: memoryview, data: memoryview) -> None:
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):  # type: ignore[override]
+        return self._decode(self._item(index))
+
+    def _item(self, index: int) -> memoryview:
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return self._data[start:end]
+
+    def _decode(self, item: memoryview) -> Any:
+        return item
+
+
+class StringTable(OffsetTable):
+    """Sorted token vocabulary, decoded on access."""
+
+    def _decode(self, item: memoryview) -> str:
+        return bytes(item).decode("utf-8")
+
+
+class PostingTable(OffsetTable):
+    """Posting lists of card ordinals as ``uint32`` views."""
+
+    def _decode(self, item: memoryview) -> memoryview:
+        return item.cast("I")
+
+
+class ProjectionTable(OffsetTable):
+    """Card projections of one language, decoded from JSON on access.
+
+    ``encoded`` returns the stored JSON without decoding it, for responses
+    that can splice it into their body.
+    """
+
+    def _decode(self, item: memoryview) -> Dict[str, Any]:
+        return json.loads(bytes(item))
+
+    def encoded(self, index: int) -> bytes:
+        """Return the compact UTF-8 JSON of the projection at ``index``."""
+        return bytes(self._item(index))
+
+
+def _offset_sections(
+    name: str,
+    items: Iterable[bytes],
+) -> List[Tuple[str, bytes]]:
+    """Return ``name`` offset and data sections for ``items``."""
+    offsets = array("Q", [0])
+    blob = bytearray()
+    for item in items:
+        blob += item
+        offsets.append(len(blob))
+    return [(f"{name}/offsets", offsets.tobytes()), (f"{name}/data", blob)]
+
+
+def write_shared(
+    path: str,
+    version: str,
+    projections: Dict[str, Sequence[Dict[str, Any]]],
+    token_index: Dict[str, Dict[str, Tuple[List[str], List[array]]]],
+) -> None:
+    """Write projections and the token index to ``path`` atomically."""
+    sections: List[Tuple[str, bytes]] = []
+    for lang, cards in projections.items():
+        encoded = (
+            json.dumps(c, ensure_ascii=False, separators=(",", ":")).encode()
+            for c in cards
+        )
+        sections += _offset_sections(f"proj/{lang}", encoded)
+    for lang, per_field in token_index.items():
+        for field, (tokens, postings) in per_field.items():
+            prefix = f"tok/{lang}/{field}"
+            sections += _offset_sections(
+                f"{prefix}/tokens", (t.encode("utf-8") for t in tokens)
+            )
+            sections += _offset_sections(
+                f"{prefix}/postings",
+                (array("I", p).tobytes() for p in postings),
+            )
+
+    layout: Dict[str, List[int]] = {}
+    position = 0
+    for name, payload in sections:
+        layout[name] = [position, len(payload)]
+        position += len(payload) + (-len(payload) % 8)
+    header = json.dumps(
+        {
+            "version": version,
+            "languages": sorted(projections),
+            "fields": {lang: sorted(f) for lang, f in token_index.items()},
+            "sections": layout,
+        }
+    ).encode("utf-8")
+    preamble = MAGIC + _LENGTH.pack(len(header)) + header
+    preamble += b"\0" * (-len(preamble) % 8)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(preamble)
+        for _, payload in sections:
+            f.write(payload)
+            f.write(b"\0" * (-len(payload) % 8))
+    os.replace(tmp_path, path)
+
+
+class SharedStore:
+    """Views into a mapped file written by ``write_shared``."""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a shared dataset file: {path}")
+        (length,) = _LENGTH.unpack_from(buffer, len(MAGIC))
+        start = len(MAGIC) + _LENGTH.size
+        end = start + length
+        header = json.loads(bytes(buffer[start:end]))
+        base = end + (-end % 8)
+        self.version: str = header["version"]
+        self._header = header
+        self._buffer = buffer
+        self._base = base
+
+    def _section(self, name: str) -> memoryview:
+        offset, length = self._header["sections"][name]
+        start = self._base + offset
+        end = start + length
+        return self._buffer[start:end]
+
+    def _table(self, cls: type, name: str) -> Any:
+        offsets = self._section(f"{name}/offsets").cast("Q")
+        return cls(offsets, self._section(f"{name}/data"))
+
+    def projections(self) -> Dict[str, ProjectionTable]:
+        """Return the card projections per language."""
+        return {
+            lang: self._table(ProjectionTable, f"proj/{lang}")
+            for lang in self._header["languages"]
+        }
+
+    def token_index(
+        self,
+    ) -> Dict[str, Dict[str, Tuple[StringTable, PostingTable]]]:
+        """Return the token index in the layout of ``build_token_index``."""
+        index: Dict[str, Dict[str, Tuple[StringTable, PostingTable]]] = {}
+        for lang, fields in self._header["fields"].items():
+            index[lang] = {}
+            for field in fields:
+                prefix = f"tok/{lang}/{field}"
+                index[lang][field] = (
+                    self._table(StringTable, f"{prefix}/tokens"),
+                    self._table(PostingTable, f"{prefix}/postings"),
+                )
+        return index
+
+
+def attach_shared(path: str, version: str) -> SharedStore | None:
+    """Return the store at ``path`` if it exists and matches ``version``."""
+    try:
+        store = SharedStore(path)
+    except (OSError, ValueError):
+        return None
+    return store if store.version == version else None
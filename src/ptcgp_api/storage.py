@@ -0,0 +1,361 @@
+"""Storage backends for users, decks and groups.
+
+The routes keep every record in memory and serve reads from there; a
+backend persists the changes they report and hands back the records to
+load. ``SQLiteStorage`` writes behind: changes are queued in memory and
+written by ``flush`` in a single transaction, which the application runs
+every ``USER_DB_FLUSH_INTERVAL`` seconds in the background. With WAL and
+``synchronous=NORMAL`` a commit does not wait for fsync; after a crash at
+most the changes of the last interval are lost.
+"""
+
+import itertools
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Tuple
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+USER_DB = os.getenv("USER_DB", "")
+USER_DB_FLUSH_INTERVAL = float(os.getenv("USER_DB_FLUSH_INTERVAL", "1"))
+
+TABLES = ("users", "decks", "groups")
+
+
+@dataclass
+class Records:
+    """Users, decks and groups as kept by the user routes."""
+
+    users: Dict[str, Dict[str, set]] = field(default_factory=dict)
+    decks: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    groups: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+
+class Storage:
+    """Keep records only in memory; the default without ``USER_DB``."""
+
+    persistent = False
+
+    def __init__(self) -> None:
+        self._counters: Dict[str, Iterator[int]] = {}
+        self._lock = threading.Lock()
+
+    def load_changes(self) -> Records | None:
+        """Return the records stored or changed since the last call.
+
+        The first call returns everything; ``None`` means no changes.
+        Changes queued but not yet flushed are applied to the returned
+        records, so merging them never undoes a local change.
+        """
+        return None
+
+    def add_user(self, user_id: str) -> None:
+        """Store a user without cards unless it exists."""
+
+    def change_cards(
+        self,
+        user_id: str,
+        kind: str,
+        added: List[str],
+        removed: List[str],
+    ) -> None:
+        """Add and remove cards of the ``kind`` list of a user."""
+
+    def add_deck(self, deck: Dict[str, Any]) -> None:
+        """Store a new deck."""
+
+    def vote(self, deck_id: str, delta: int) -> None:
+        """Add ``delta`` to the votes of a deck."""
+
+    def add_group(self, group: Dict[str, Any]) -> None:
+        """Store a new group."""
+
+    def join_group(self, group_id: str, user_id: str) -> None:
+        """Add a member to a group."""
+
+    def next_id(self, table: str) -> str:
+        """Return an unused numeric ID for a new deck or group."""
+        with self._lock:
+            counter = self._counters.setdefault(table, itertools.count(1))
+            return str(next(counter))
+
+    def flush(self) -> int:
+        """Write all pending changes and return their number."""
+        return 0
+
+    def close(self) -> None:
+        """Flush pending changes and release resources."""
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_cards (
+    user_id TEXT,
+    kind TEXT,
+    card_id TEXT,
+    PRIMARY KEY (user_id, kind, card_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS decks (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    cards TEXT,
+    votes INTEGER NOT NULL,
+    seq INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS groups (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    seq INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS group_members (
+    group_id TEXT,
+    user_id TEXT,
+    UNIQUE (group_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_seq ON users (seq);
+CREATE INDEX IF NOT EXISTS decks_seq ON decks (seq);
+CREATE INDEX IF NOT EXISTS groups_seq ON groups (seq);
+"""
+
+_ADD_USER = "INSERT INTO users (id, seq) VALUES (?, 0) ON CONFLICT DO NOTHING"
+_ADD_CARD = "INSERT OR IGNORE INTO user_cards VALUES (?, ?, ?)"
+_REMOVE_CARD = """
+DELETE FROM user_cards WHERE user_id = ? AND kind = ? AND card_id = ?
+"""
+_ADD_DECK = "INSERT INTO decks VALUES (?, ?, ?, ?, 0)"
+_VOTE = "UPDATE decks SET votes = votes + ? WHERE id = ?"
+_ADD_GROUP = "INSERT INTO groups VALUES (?, ?, 0)"
+_JOIN_GROUP = "INSERT OR IGNORE INTO group_members VALUES (?, ?)"
+_READ_USERS = """
+SELECT users.id, kind, card_id FROM users
+LEFT JOIN user_cards ON user_id = users.id
+WHERE seq > ? ORDER BY users.rowid
+"""
+_READ_DECKS = """
+SELECT id, name, cards, votes FROM decks WHERE seq > ? ORDER BY rowid
+"""
+_READ_GROUPS = """
+SELECT id, name, user_id FROM groups
+LEFT JOIN group_members ON group_id = id
+WHERE seq > ? ORDER BY groups.rowid, group_members.rowid
+"""
+_NEXT_VALUE = (
+    "INSERT INTO counters (name, value) VALUES (?, 1) "
+    "ON CONFLICT(name) DO UPDATE SET value = value + 1 RETURNING value"
+)
+
+
+class SQLiteStorage(Storage):
+    """Store records in a SQLite database in WAL mode.
+
+    Changes are stored as deltas (single cards, vote increments, group
+    members), so several workers can share one database without
+    overwriting each other's updates. Every flush stamps the records it
+    touched with a new sequence number, and ``load_changes`` reads only
+    records with a higher number than seen before.
+    """
+
+    persistent = True
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.path = path
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        # Queued statements with their parameter rows, in call order
+        self._pending: List[Tuple[str, List[Tuple[Any, ...]]]] = []
+        # Records changed by the queued statements, per table
+        self._touched: Dict[str, set] = {table: set() for table in TABLES}
+        self._db_lock = threading.Lock()
+        self._seq = -1
+        self._data_version = -1
+        with self._db_lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.executescript(_SCHEMA)
+
+    def _queue(self, table: str, key: str, sql: str, *rows: Tuple) -> None:
+        with self._lock:
+            self._touched[table].add(key)
+            if self._pending and self._pending[-1][0] == sql:
+                self._pending[-1][1].extend(rows)
+            else:
+                self._pending.append((sql, list(rows)))
+
+    def add_user(self, user_id: str) -> None:
+        self._queue("users", user_id, _ADD_USER, (user_id,))
+
+    def change_cards(
+        self,
+        user_id: str,
+        kind: str,
+        added: List[str],
+        removed: List[str],
+    ) -> None:
+        self.add_user(user_id)
+        if removed:
+            rows = [(user_id, kind, card_id) for card_id in removed]
+            self._queue("users", user_id, _REMOVE_CARD, *rows)
+        if added:
+            rows = [(user_id, kind, card_id) for card_id in added]
+            self._queue("users", user_id, _ADD_CARD, *rows)
+
+    def add_deck(self, deck: Dict[str, Any]) -> None:
+        cards = json.dumps(deck["cards"])
+        row = (deck["id"], deck["name"], cards, deck["votes"])
+        self._queue("decks", deck["id"], _ADD_DECK, row)
+
+    def vote(self, deck_id: str, delta: int) -> None:
+        self._queue("decks", deck_id, _VOTE, (delta, deck_id))
+
+    def add_group(self, group: Dict[str, Any]) -> None:
+        row = (group["id"], group["name"])
+        self._queue("groups", group["id"], _ADD_GROUP, row)
+        for user_id in group["members"]:
+            self.join_group(group["id"], user_id)
+
+    def join_group(self, group_id: str, user_id: str) -> None:
+        self._queue("groups", group_id, _JOIN_GROUP, (group_id, user_id))
+
+    def next_id(self, table: str) -> str:
+        with self._db_lock:
+            row = self._conn.execute(_NEXT_VALUE, (table,)).fetchone()
+        return str(row[0])
+
+    def flush(self) -> int:
+        # The queue is taken under the database lock, so ``load_changes``
+        # sees every change either in the database or still queued.
+        with self._db_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                touched = self._touched
+                self._touched = {table: set() for table in touched}
+            if not pending:
+                return 0
+            count = sum(len(rows) for _, rows in pending)
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                for sql, rows in pending:
+                    self._conn.executemany(sql, rows)
+                seq = self._conn.execute(_NEXT_VALUE, ("seq",)).fetchone()[0]
+                for table, keys in touched.items():
+                    self._conn.executemany(
+                        f"UPDATE {table} SET seq = ? WHERE id = ?",
+                        [(seq, key) for key in keys],
+                    )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                # Keep the changes for the next attempt. BEGIN fails while
+                # another connection writes, so there may be nothing to roll
+                # back.
+                with self._lock:
+                    self._pending[:0] = pending
+                    for table, keys in touched.items():
+                        self._touched[table] |= keys
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+        logger.debug("Flushed %d changes to %s", count, self.path)
+        return count
+
+    def load_changes(self) -> Records | None:
+        with self._db_lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._data_version:
+                return None
+            self._data_version = version
+            self._conn.execute("BEGIN")
+            try:
+                records = self._read(self._seq)
+                row = self._conn.execute(
+                    "SELECT value FROM counters WHERE name = 'seq'"
+                ).fetchone()
+            finally:
+                self._conn.execute("COMMIT")
+            self._seq = row[0] if row else 0
+            self._apply_pending(records)
+        return records
+
+    def _apply_pending(self, records: Records) -> None:
+        """Replay the queued card, vote and member changes onto ``records``.
+
+        Read records then match what the caller holds in memory, including
+        its changes that are not flushed yet.
+        """
+        with self._lock:
+            pending = [(sql, list(rows)) for sql, rows in self._pending]
+        for sql, rows in pending:
+            if sql in (_ADD_CARD, _REMOVE_CARD):
+                for user_id, kind, card_id in rows:
+                    user = records.users.get(user_id)
+                    if user is None:
+                        continue
+                    if sql == _ADD_CARD:
+                        user[kind].add(card_id)
+                    else:
+                        user[kind].discard(card_id)
+            elif sql == _VOTE:
+                for delta, deck_id in rows:
+                    deck = records.decks.get(deck_id)
+                    if deck is not None:
+                        deck["votes"] += delta
+            elif sql == _JOIN_GROUP:
+                for group_id, user_id in rows:
+                    group = records.groups.get(group_id)
+                    if group is not None and user_id not in group["members"]:
+                        group["members"].append(user_id)
+
+    def _read(self, seq: int) -> Records:
+        """Return all records stamped with a sequence number above ``seq``."""
+        records = Records()
+        rows = self._conn.execute(_READ_USERS, (seq,))
+        for user_id, kind, card_id in rows:
+            user = records.users.get(user_id)
+            if user is None:
+                user = records.users[user_id] = {"have": set(), "want": set()}
+            if kind is not None:
+                user[kind].add(card_id)
+        rows = self._conn.execute(_READ_DECKS, (seq,))
+        for deck_id, name, cards, votes in rows:
+            records.decks[deck_id] = {
+                "id": deck_id,
+                "name": name,
+                "cards": json.loads(cards),
+                "votes": votes,
+            }
+        rows = self._conn.execute(_READ_GROUPS, (seq,))
+        for group_id, name, user_id in rows:
+            group = records.groups.get(group_id)
+            if group is None:
+                group = {"id": group_id, "name": name, "members": []}
+                records.groups[group_id] = group
+            if user_id is not None:
+                group["members"].append(user_id)
+        return records
+
+    def close(self) -> None:
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+
+def open_storage(path: str = USER_DB) -> Storage:
+    """Return the SQLite backend for ``path`` or in-memory storage."""
+    if not path:
+        return Storage()
+    logger.info("Storing user data in %s", path)
+    return SQLiteStorage(path)
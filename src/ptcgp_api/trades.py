@@ -0,0 +1,154 @@
+"""Inverted have/want indexes for trade matching."""
+
+import threading
+from typing import Dict, Iterable, List, Set, Tuple
+
+# card id -> ids of users listing that card
+Postings = Dict[str, Set[str]]
+# partner id -> (cards the partner wants from us, cards we want from them)
+Candidates = Dict[str, Tuple[List[str], List[str]]]
+
+
+class TradeIndex:
+    """Map every card to the users who have it and who want it.
+
+    Two users match when one has a card the other wants and vice versa.
+    Partners are found by walking the posting lists of a user's cards, so
+    the cost depends on the overlap of the lists, not on the user count.
+
+    The resulting match graph is kept as well: a list change only affects
+    the edges of that user, so ``refresh`` recomputes just those and the
+    sorted pair list is rebuilt on the next read after an edge changed.
+    """
+
+    def __init__(self) -> None:
+        self.have: Postings = {}
+        self.want: Postings = {}
+        # user id -> ids of matching users, symmetric
+        self.matches: Dict[str, Set[str]] = {}
+        # user id -> position of the first update, for a stable pair order
+        self._order: Dict[str, int] = {}
+        self._pairs: List[Dict[str, str]] | None = None
+        self._lock = threading.RLock()
+
+    def update(
+        self,
+        user_id: str,
+        kind: str,
+        old: Iterable[str],
+        new: Iterable[str],
+    ) -> None:
+        """Replace the ``kind`` (``have``/``want``) list of ``user_id``.
+
+        Only the postings change; call ``refresh`` afterwards to update
+        the matches of the user.
+        """
+        old, new = set(old), set(new)
+        self.apply(user_id, kind, new - old, old - new)
+
+    def apply(
+        self,
+        user_id: str,
+        kind: str,
+        added: Iterable[str],
+        removed: Iterable[str],
+    ) -> None:
+        """Add and remove single cards of the ``kind`` list of ``user_id``.
+
+        Like ``update``, but only touches the postings of the given cards.
+        """
+        postings = self.have if kind == "have" else self.want
+        with self._lock:
+            self._order.setdefault(user_id, len(self._order))
+            for card_id in removed:
+                users = postings.get(card_id)
+                if users is not None:
+                    users.discard(user_id)
+                    if not users:
+                        del postings[card_id]
+            for card_id in added:
+                postings.setdefault(card_id, set()).add(user_id)
+
+    def refresh(
+        self,
+        user_id: str,
+        have: Iterable[str],
+        want: Iterable[str],
+    ) -> None:
+        """Recompute the matches of ``user_id`` after a list change."""
+        with self._lock:
+            partners = self.partners(have, want)
+            partners.discard(user_id)
+            old = self.matches.get(user_id, set())
+            if partners == old:
+                return
+            for partner in old - partners:
+                self.matches[partner].discard(user_id)
+            for partner in partners - old:
+                self.matches.setdefault(partner, set()).add(user_id)
+            self.matches[user_id] = partners
+            self._pairs = None
+
+    def order(self, user_id: str) -> int:
+        """Return the position of the first update of ``user_id``.
+
+        Users not in the index sort after all others.
+        """
+        return self._order.get(user_id, len(self._order))
+
+    def pairs(self) -> List[Dict[str, str]]:
+        """Return every match once, ordered by first update of the users.
+
+        The list is shared between calls and must not be modified.
+        """
+        with self._lock:
+            if self._pairs is None:
+                order = self._order
+                pairs = [
+                    (order[a], order[b], a, b)
+                    for a, partners in self.matches.items()
+                    for b in partners
+                    if order[a] < order[b]
+                ]
+                pairs.sort()
+                result = [{"user_a": a, "user_b": b} for *_, a, b in pairs]
+                self._pairs = result
+            return self._pairs
+
+    def _users_of(self, postings: Postings, cards: Iterable[str]) -> Set[str]:
+        users: Set[str] = set()
+        for card_id in cards:
+            users.update(postings.get(card_id, ()))
+        return users
+
+    def partners(self, have: Iterable[str], want: Iterable[str]) -> Set[str]:
+        """Return users who want one of ``have`` and have one of ``want``."""
+        with self._lock:
+            wanting = self._users_of(self.want, have)
+            if not wanting:
+                return wanting
+            return wanting & self._users_of(self.have, want)
+
+    def candidates(
+        self,
+        user_id: str,
+        have: Iterable[str],
+        want: Iterable[str],
+    ) -> Candidates:
+        """Return the tradeable cards per partner of ``user_id``.
+
+        Only the posting lists of the user's own cards are read.
+        """
+        give: Dict[str, List[str]] = {}
+        receive: Dict[str, List[str]] = {}
+        with self._lock:
+            for card_id in sorted(have):
+                for partner in self.want.get(card_id, ()):
+                    give.setdefault(partner, []).append(card_id)
+            for card_id in sorted(want):
+                for partner in self.have.get(card_id, ()):
+                    if partner in give:
+                        receive.setdefault(partner, []).append(card_id)
+        receive.pop(user_id, None)
+        pairs = receive.items()
+        return {partner: (give[partner], cards) for partner, cards in pairs}
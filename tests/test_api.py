@@ -20,6 +20,20 @@ def client():
         yield c
 
 
+@pytest.fixture()
+def user_store(monkeypatch):
+    """Give the test empty user records and trade index; call to reset."""
+    from ptcgp_api.trades import TradeIndex
+
+    def reset():
+        for name in ("_users", "_decks", "_groups"):
+            monkeypatch.setattr(users_routes, name, {})
+        monkeypatch.setattr(users_routes, "_trade_index", TradeIndex())
+
+    reset()
+    return reset
+
+
 @pytest.fixture(autouse=True)
 def disable_network(monkeypatch, client):
     """Avoid real network calls during tests."""
@@ -175,13 +189,191 @@ def test_get_unknown_set(client):
     assert resp.json()["detail"] == "Set nicht gefunden"
 
 
-def test_trade_matches_empty(client, monkeypatch):
-    monkeypatch.setattr(users_routes, "_users", {})
+def test_trade_matches_empty(client, user_store):
     resp = client.get("/trades/matches")
     assert resp.status_code == 200
     assert resp.json() == []
 
 
+def test_trade_matches_use_index(client, user_store):
+    lists = {
+        "ash": (["001", "002"], ["003"]),
+        "misty": (["003"], ["001"]),
+        "brock": (["003", "004"], ["002", "005"]),
+        "gary": (["005"], ["006"]),
+    }
+    for user, (have, want) in lists.items():
+        for kind, cards in (("have", have), ("want", want)):
+            url = f"/users/{user}/{kind}"
+            client.post(url, json={"cards": cards}, headers=HEADERS)
+    resp = client.get("/trades/matches")
+    assert resp.json() == [
+        {"user_a": "ash", "user_b": "misty"},
+        {"user_a": "ash", "user_b": "brock"},
+    ]
+
+    # the pair list is cached until a list change alters a match
+    index = users_routes._trade_index
+    pairs = index.pairs()
+    client.post("/users/gary/want", json={"cards": ["007"]}, headers=HEADERS)
+    assert index.pairs() is pairs
+
+    # replacing a list drops the user from the postings of removed cards
+    client.post("/users/misty/want", json={"cards": ["009"]}, headers=HEADERS)
+    resp = client.get("/trades/matches")
+    assert resp.json() == [{"user_a": "ash", "user_b": "brock"}]
+    assert "misty" not in index.want.get("001", ())
+    assert "misty" not in index.matches["ash"]
+
+
+def test_user_list_deltas_and_import(client, user_store):
+    client.post("/users/ash/have", json={"cards": ["001"]}, headers=HEADERS)
+
+    resp = client.patch(
+        "/users/ash/have",
+        json={"add": ["001", "002"], "remove": ["003"]},
+        headers=HEADERS,
+    )
+    assert resp.status_code == 200
+    assert resp.json() == {"user": "ash", "added": ["002"], "removed": []}
+    delta = {"add": ["003"]}
+    resp = client.patch("/users/ash/want", json=delta, headers=HEADERS)
+    assert resp.json() == {"user": "ash", "added": ["003"], "removed": []}
+
+    resp = client.post(
+        "/users/import",
+        json={
+            "users": [
+                {"user": "ash", "have": ["002", "004"]},
+                {"user": "misty", "have": ["003"], "want": ["002"]},
+            ]
+        },
+        headers=HEADERS,
+    )
+    assert resp.status_code == 200
+    assert resp.json()["users"] == [
+        {"user": "ash", "have": {"added": ["004"], "removed": ["001"]}},
+        {
+            "user": "misty",
+            "have": {"added": ["003"], "removed": []},
+            "want": {"added": ["002"], "removed": []},
+        },
+    ]
+    assert client.get("/users/ash").json() == {
+        "user": "ash",
+        "have": ["002", "004"],
+        "want": ["003"],
+    }
+    assert client.get("/trades/matches").json() == [
+        {"user_a": "ash", "user_b": "misty"}
+    ]
+
+    delta = {"remove": ["003"]}
+    resp = client.patch("/users/misty/have", json=delta, headers=HEADERS)
+    assert resp.json()["removed"] == ["003"]
+    assert client.get("/trades/matches").json() == []
+
+
+def test_user_data_persists_in_sqlite(
+    client,
+    monkeypatch,
+    tmp_path,
+    user_store,
+):
+    from ptcgp_api.storage import SQLiteStorage
+
+    path = str(tmp_path / "users.db")
+    monkeypatch.setattr(users_routes, "_storage", SQLiteStorage(path))
+    client.post("/users/ash/have", json={"cards": ["001"]}, headers=HEADERS)
+    deck = {"name": "Arceus", "cards": ["001"]}
+    deck_id = client.post("/decks", json=deck, headers=HEADERS).json()["id"]
+    client.post(f"/decks/{deck_id}/vote?vote=up", headers=HEADERS)
+    # a miss only merges other workers' changes; the vote stays queued
+    assert client.get("/users/nobody").status_code == 404
+    assert client.get("/decks").json()[0]["votes"] == 1
+    assert users_routes._storage.flush() == 1
+    users_routes.close_store()
+
+    # a restarted worker loads the records on the first request
+    monkeypatch.setattr(users_routes, "_storage", SQLiteStorage(path))
+    monkeypatch.setattr(users_routes, "_loaded", False)
+    user_store()
+    assert client.get("/users/ash").json()["have"] == ["001"]
+    assert client.get(f"/decks/{deck_id}").json()["votes"] == 1
+    deck = client.post("/decks", json=deck, headers=HEADERS).json()
+    assert deck["id"] != deck_id
+    users_routes.close_store()
+
+
+def test_create_survives_failed_flush(
+    client,
+    monkeypatch,
+    tmp_path,
+    user_store,
+):
+    import sqlite3
+
+    from ptcgp_api.storage import SQLiteStorage
+
+    storage = SQLiteStorage(str(tmp_path / "users.db"))
+    monkeypatch.setattr(users_routes, "_storage", storage)
+
+    # another worker holds the write lock; the records are written later
+    def busy():
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(storage, "flush", busy)
+    deck = {"name": "Arceus", "cards": ["001"]}
+    resp = client.post("/decks", json=deck, headers=HEADERS)
+    assert resp.status_code == 200
+    resp = client.post("/groups", json={"name": "Club"}, headers=HEADERS)
+    assert resp.status_code == 200
+    monkeypatch.delattr(storage, "flush")
+    assert storage.flush() == 2
+    users_routes.close_store()
+
+
+def test_user_matches_ranked(client, user_store):
+    lists = {
+        "ash": (["001", "002", "010", "011"], ["003", "004", "005"]),
+        "misty": (["003", "004"], ["010", "011"]),
+        "brock": (["003", "004", "005"], ["001", "002"]),
+        "gary": (["003"], []),
+    }
+    for user, (have, want) in lists.items():
+        for kind, cards in (("have", have), ("want", want)):
+            url = f"/users/{user}/{kind}"
+            client.post(url, json={"cards": cards}, headers=HEADERS)
+
+    resp = client.get("/users/ash/matches", params={"limit": 1})
+    assert resp.status_code == 200
+    assert resp.headers["X-Total-Count"] == "2"
+    assert resp.json() == [
+        {
+            "user": "misty",
+            "score": 2,
+            "give": ["010", "011"],
+            "receive": ["003", "004"],
+        }
+    ]
+    cursor = resp.headers["X-Next-Cursor"]
+    resp = client.get("/users/ash/matches", params={"cursor": cursor})
+    assert [m["user"] for m in resp.json()] == ["brock"]
+    assert "X-Next-Cursor" not in resp.headers
+
+    # 001 (Crown) and 002 (Three Star) outweigh three unknown cards
+    resp = client.get("/users/ash/matches", params={"weighted": True})
+    assert [(m["user"], m["score"]) for m in resp.json()] == [
+        ("brock", 3),
+        ("misty", 2),
+    ]
+
+    assert client.get("/users/gary/matches").json() == []
+    assert client.get("/users/nobody/matches").status_code == 404
+    index = users_routes._trade_index
+    assert [index.order(u) for u in ("ash", "gary", "nobody")] == [0, 3, 4]
+
+
 def test_validation_errors(client):
     resp = client.post(
         "/decks",
@@ -223,3 +415,361 @@ def test_http_client_closed_after_shutdown():
     with TestClient(app) as local:
         assert not local.app.state.http_client.is_closed
     assert local.app.state.http_client.is_closed
+
+
+def test_cached_responses_are_identical(client):
+    from ptcgp_api.cache import response_cache
+
+    response_cache.clear()
+    first = client.get("/cards/001", params={"lang": "en"})
+    assert len(response_cache) == 1
+    second = client.get("/cards/001", params={"lang": "en"})
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert second.headers["content-type"] == "application/json"
+    assert second.json()["name"] == "Arceus ex"
+
+    first = client.get("/sets", params={"lang": "en"})
+    second = client.get("/sets", params={"lang": "en"})
+    assert second.content == first.content
+    assert client.get("/sets", params={"lang": "de"}).content != first.content
+
+    # listings are cached with their paging headers
+    params = {"limit": 1, "sort": "name"}
+    first = client.get("/cards", params=params)
+    cached = len(response_cache)
+    second = client.get("/cards", params=params)
+    assert len(response_cache) == cached
+    assert second.content == first.content
+    for header in ("etag", "x-total-count", "x-next-cursor"):
+        assert second.headers[header] == first.headers[header]
+    first = client.get("/cards/batch", params={"ids": "001,x"})
+    second = client.get("/cards/batch", params={"ids": "001,x"})
+    assert second.content == first.content
+
+
+def test_conditional_get_returns_not_modified(client):
+    # card bodies carry image URLs, so their tags are weak
+    for path, params, weak in [
+        ("/cards", {"type": "Colorless"}, True),
+        ("/cards/001", {"lang": "en"}, True),
+        ("/sets", {}, False),
+        ("/events", {}, False),
+    ]:
+        first = client.get(path, params=params)
+        etag = first.headers["etag"]
+        assert etag.startswith("W/") is weak
+        assert first.headers["cache-control"] == "public, max-age=300"
+        opaque = etag.removeprefix("W/")
+        for header in (opaque, f"W/{opaque}", f'"other", {etag}'):
+            again = client.get(
+                path,
+                params=params,
+                headers={"If-None-Match": header},
+            )
+            assert again.status_code == 304
+            assert again.content == b""
+            assert again.headers["etag"] == etag
+        star = client.get(path, params=params, headers={"If-None-Match": "*"})
+        assert star.status_code == 200
+        stale = client.get(path, params=params, headers={"If-None-Match": "x"})
+        assert stale.status_code == 200
+        assert stale.headers["etag"] == etag
+
+    star = {"If-None-Match": "*"}
+    assert client.get("/cards/999", headers=star).status_code == 404
+    assert client.get("/sets/NOPE", headers=star).status_code == 404
+    resp = client.get("/cards", params={"sort": "bogus"}, headers=star)
+    assert resp.status_code == 400
+
+    one = client.get("/cards", params={"limit": 1}).headers["etag"]
+    two = client.get("/cards", params={"limit": 2}).headers["etag"]
+    assert one != two
+
+
+def test_responses_are_compressed(client, monkeypatch):
+    from ptcgp_api import cache, compression
+    from ptcgp_api.compression import ENCODINGS, choose_encoding
+
+    gzip = {"Accept-Encoding": "gzip"}
+    plain = client.get("/cards", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["vary"] == "Accept-Encoding"
+    packed = client.get("/cards", headers=gzip)
+    assert packed.headers["content-encoding"] == "gzip"
+    assert int(packed.headers["content-length"]) < len(plain.content)
+    assert packed.json() == plain.json()
+    assert packed.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    again = client.get(
+        "/cards",
+        headers={**gzip, "If-None-Match": packed.headers["etag"]},
+    )
+    assert again.status_code == 304
+
+    # Cached bodies keep one compressed variant per encoding
+    monkeypatch.setattr(cache, "COMPRESSION_MIN_SIZE", 100)
+    cache.response_cache.clear()
+    first = client.get("/cards/001", headers=gzip)
+    assert "content-encoding" not in first.headers
+    for _ in range(2):
+        hit = client.get("/cards/001", headers=gzip)
+        assert hit.headers["content-encoding"] == "gzip"
+        assert hit.json() == first.json()
+        assert len(cache.response_cache) == 2
+
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding("deflate, *;q=0.5") == ENCODINGS[0]
+    assert choose_encoding("") is None
+    assert choose_encoding("gzip;q=0.5, identity") is None
+    # q-values rank first, the server order only breaks ties
+    monkeypatch.setattr(compression, "ENCODINGS", ["br", "zstd", "gzip"])
+    assert choose_encoding("br;q=0.5, gzip;q=0.9") == "gzip"
+    assert choose_encoding("gzip, zstd, br;q=0.8") == "zstd"
+    assert choose_encoding("gzip;q=0.2, *;q=0.4") == "br"
+
+
+def test_sparse_fieldsets(client, monkeypatch):
+    import ptcgp_api.routes.cards as cards_routes
+
+    summary = client.get("/cards", params={"view": "summary", "lang": "en"})
+    assert summary.json()[0] == {
+        "id": "001",
+        "name": "Arceus ex",
+        "image": summary.json()[0]["image"],
+        "rarity": "Crown",
+    }
+    full = client.get("/cards", params={"lang": "en"})
+    assert len(summary.content) < len(full.content)
+
+    async def no_images(*_):
+        raise AssertionError("image resolved")
+
+    monkeypatch.setattr(cards_routes, "_image_urls", no_images)
+    monkeypatch.setattr(cards_routes, "_image_url", no_images)
+    resp = client.get("/cards", params={"fields": "hp, id,hp,unknown"})
+    assert resp.json() == [{"hp": 140, "id": "001"}, {"hp": 140, "id": "002"}]
+    resp = client.get("/cards/002", params={"fields": "id,set", "lang": "en"})
+    assert resp.json()["set"]["name"] == "Triumphant Light"
+    assert list(resp.json()) == ["id", "set"]
+    resp = client.get(
+        "/cards/search",
+        params={"q": "arceus", "fields": "name", "select": "id"},
+    )
+    assert resp.json() == [{"id": "001"}, {"id": "002"}]
+    assert client.get("/cards", params={"view": "tiny"}).status_code == 422
+
+
+def test_cards_batch(client, monkeypatch):
+    import ptcgp_api.routes.cards as cards_routes
+
+    resp = client.get("/cards/batch", params={"ids": "002,999,001,002"})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert [c["id"] for c in body["cards"]] == ["002", "001"]
+    assert body["missing"] == ["999"]
+    assert "image" in body["cards"][0]
+    assert resp.headers["etag"]
+
+    resp = client.get(
+        "/cards/batch",
+        params=[("ids", "001"), ("ids", "002"), ("view", "summary")],
+    )
+    assert [list(c) for c in resp.json()["cards"]] == [
+        ["id", "name", "image", "rarity"]
+    ] * 2
+
+    resp = client.post(
+        "/cards/batch",
+        params={"fields": "id", "lang": "en"},
+        json={"cards": ["001", "x"]},
+    )
+    assert resp.json() == {"cards": [{"id": "001"}], "missing": ["x"]}
+
+    monkeypatch.setattr(cards_routes, "BATCH_MAX_IDS", 1)
+    resp = client.post("/cards/batch", json={"cards": ["001", "002"]})
+    assert resp.status_code == 400
+    assert client.get("/cards/batch").status_code == 422
+
+
+def test_export_streams_ndjson(client, monkeypatch):
+    import json
+
+    import ptcgp_api.routes.cards as cards_routes
+
+    monkeypatch.setattr(cards_routes, "EXPORT_CHUNK_SIZE", 1)
+    with client.stream("GET", "/cards/export", params={"lang": "en"}) as resp:
+        assert resp.status_code == 200
+        assert resp.headers["content-type"] == "application/x-ndjson"
+        lines = list(resp.iter_lines())
+    cards = [json.loads(line) for line in lines]
+    assert [c["id"] for c in cards] == ["001", "002"]
+    assert cards[0]["name"] == "Arceus ex"
+    assert "image" in cards[0]
+
+    resp = client.get(
+        "/cards/export",
+        params={"view": "summary"},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert resp.headers["content-encoding"] == "gzip"
+    assert len(resp.text.splitlines()) == 2
+    assert client.get("/cards/export?format=csv").status_code == 422
+
+
+def test_shared_dataset_responses_match_local(client, monkeypatch, tmp_path):
+    from ptcgp_api import data
+    from ptcgp_api.cache import response_cache
+
+    requests = [
+        ("GET", "/cards", {"lang": "en", "sort": "-name"}),
+        ("GET", "/cards/search", {"q": "arc"}),
+        ("GET", "/cards/batch", {"ids": "002,x,001"}),
+        ("GET", "/cards/export", {"lang": "fr"}),
+        ("GET", "/cards", {"view": "summary"}),
+    ]
+    local = [client.request(*r[:2], params=r[2]) for r in requests]
+
+    shared = data.build_dataset(text_index=False)
+    assert shared.token_index == {}
+    data.share_dataset(shared, str(tmp_path / "dataset.shm"))
+    assert shared.get_encoded_projections("en") is not None
+    monkeypatch.setattr(data, "_dataset", shared)
+    response_cache.clear()
+    for (method, url, params), expected in zip(requests, local):
+        resp = client.request(method, url, params=params)
+        assert resp.content == expected.content
+        for header in ("etag", "x-total-count", "content-type"):
+            assert resp.headers.get(header) == expected.headers.get(header)
+
+
+def test_card_facets(client):
+    resp = client.get("/cards/facets")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["total"] == 2
+    assert body["facets"]["rarity"] == {"Crown": 1, "Three Star": 1}
+    assert body["facets"]["type"] == {"Colorless": 2}
+    assert body["facets"]["set_id"] == {"A2a": 2}
+    assert set(body["facets"]) == {
+        "set_id",
+        "type",
+        "rarity",
+        "stage",
+        "trainerType",
+        "booster",
+    }
+    resp = client.get("/cards/facets", params={"illustrator": "Takumi Wada"})
+    assert resp.json()["total"] == 1
+    assert resp.json()["facets"]["rarity"] == {"Three Star": 1}
+    resp = client.get("/cards/facets", params={"rarity": "None"})
+    assert resp.json() == {
+        "total": 0,
+        "facets": {k: {} for k in body["facets"]},
+    }
+
+
+def test_cards_sorted(client):
+    def ids(path, **params):
+        resp = client.get(path, params={"fields": "id", **params})
+        assert resp.status_code == 200
+        return [c["id"] for c in resp.json()]
+
+    assert ids("/cards", sort="rarity") == ["002", "001"]
+    assert ids("/cards", sort="-rarity") == ["001", "002"]
+    assert ids("/cards", sort="hp,-id") == ["002", "001"]
+    assert ids("/cards", sort="-hp") == ["001", "002"]
+
+    first = client.get("/cards", params={"sort": "rarity", "limit": 1})
+    assert [c["id"] for c in first.json()] == ["002"]
+    cursor = first.headers["x-next-cursor"]
+    rest = client.get(
+        "/cards",
+        params={"sort": "rarity", "limit": 1, "cursor": cursor},
+    )
+    assert [c["id"] for c in rest.json()] == ["001"]
+    assert "x-next-cursor" not in rest.headers
+
+    assert ids("/cards/search", q="arceus", sort="rarity") == ["002", "001"]
+    resp = client.get("/cards", params={"sort": "price"})
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Ungültiges Sortierfeld: price"
+
+
+def test_cards_filters_combined(client):
+    resp = client.get(
+        "/cards",
+        params={"type": "Colorless", "rarity": "Three Star", "hp_min": 100},
+    )
+    assert [c["id"] for c in resp.json()] == ["002"]
+    resp = client.get("/cards", params={"retreat_min": 3})
+    assert resp.json() == []
+
+
+def test_cards_pagination(client):
+    resp = client.get("/cards", params={"limit": 1})
+    assert [c["id"] for c in resp.json()] == ["001"]
+    assert resp.headers["X-Total-Count"] == "2"
+    token = resp.headers["X-Next-Cursor"]
+
+    resp = client.get("/cards", params={"limit": 1, "cursor": token})
+    assert [c["id"] for c in resp.json()] == ["002"]
+    assert "X-Next-Cursor" not in resp.headers
+
+    resp = client.get("/cards", params={"offset": 1})
+    assert [c["id"] for c in resp.json()] == ["002"]
+
+    resp = client.get("/cards", params={"cursor": "invalid"})
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Ungültiger Cursor"
+
+
+def test_search_cards_prefix_and_limit(client):
+    resp = client.get("/cards/search", params={"q": "arc", "limit": 1})
+    assert resp.status_code == 200
+    assert [c["id"] for c in resp.json()] == ["001"]
+    assert resp.headers["X-Total-Count"] == "2"
+
+
+def test_suggest_cards(client):
+    resp = client.get("/cards/suggest", params={"q": "ARC", "lang": "en"})
+    assert resp.status_code == 200
+    assert resp.json() == [{"id": "001", "name": "Arceus ex"}]
+    resp = client.get("/cards/suggest", params={"q": "zz"})
+    assert resp.json() == []
+    resp = client.get("/cards/suggest", params={"q": ""})
+    assert resp.status_code == 422
+    assert client.get("/cards/suggest", params={"q": "  "}).json() == []
+
+
+def test_search_ignores_accents(client):
+    resp = client.get("/cards/search", params={"q": "POKEMON", "lang": "en"})
+    assert {c["id"] for c in resp.json()} == {"001", "002"}
+
+
+def test_admin_reload_swaps_dataset(client, monkeypatch, tmp_path):
+    import json
+    import shutil
+    from ptcgp_api import data
+
+    paths = []
+    for path in data.SOURCE_PATHS:
+        target = tmp_path / Path(path).name
+        shutil.copy(path, target)
+        paths.append(str(target))
+    monkeypatch.setattr(data, "SOURCE_PATHS", paths)
+    monkeypatch.setattr(data, "_dataset", data._dataset)
+    old_version = data.get_dataset().version
+
+    resp = client.post("/admin/reload", headers=HEADERS)
+    assert resp.json() == {"reloaded": False, "version": old_version}
+
+    cards_path = tmp_path / "cards.json"
+    cards = json.loads(cards_path.read_text(encoding="utf-8"))
+    cards_path.write_text(json.dumps(cards[:1]), encoding="utf-8")
+    resp = client.post("/admin/reload", headers=HEADERS)
+    assert resp.json()["reloaded"] is True
+    assert resp.json()["version"] != old_version
+    assert [c["id"] for c in client.get("/cards").json()] == ["001"]
+    assert client.get("/cards/002").status_code == 404
+
+    assert client.post("/admin/reload").status_code == 401
@@ -25,3 +25,164 @@ def test_filter_language():
     data = {"de": "Hallo", "en": "Hi"}
     assert filter_language(data, "de") == "Hallo"
     assert filter_language(data, "en") == "Hi"
+
+
+def test_card_projections_are_language_filtered():
+    from ptcgp_api.data import (
+        _cards,
+        get_card_projection,
+        get_card_projections,
+    )
+
+    projections = get_card_projections("en")
+    assert len(projections) == len(_cards)
+    card = get_card_projection("001", "en")
+    assert card is projections[0]
+    assert card["name"] == "Arceus ex"
+    assert card["set"]["name"] == "Triumphant Light"
+    assert "_local_id" not in card
+    assert get_card_projection("001", "xx") is get_card_projection("001", "de")
+
+
+def test_response_cache_is_bounded():
+    from ptcgp_api.cache import ResponseCache
+
+    cache = ResponseCache(maxsize=40, ttl=60)
+    cache.store("a", {"value": "x" * 10})
+    cache.store("b", {"value": "y" * 10})
+    cache.store("big", {"value": "z" * 100})
+    assert cache.get("a") is None
+    assert cache.get("b").body == b'{"value":"yyyyyyyyyy"}'
+    assert cache.get("big") is None
+
+
+def test_filter_cards_bitmaps():
+    from ptcgp_api.data import filter_cards, iter_ordinals
+
+    assert filter_cards() == 0b11
+    assert filter_cards(rarity="Crown") == 0b01
+    assert filter_cards(type_="Colorless", illustrator="Takumi Wada") == 0b10
+    assert filter_cards(rarity="Crown", illustrator="Takumi Wada") == 0
+    assert filter_cards(hp_min=140, hp_max=140, retreat_max=2) == 0b11
+    assert filter_cards(hp_min=150) == 0
+    assert filter_cards(weakness="Fighting", category="Pokemon") == 0b11
+    assert list(iter_ordinals(0b1011)) == [0, 1, 3]
+
+
+def test_legacy_indexes_from_bitmaps():
+    from ptcgp_api import data
+
+    assert data._index_by_set == {"A2a": {"001", "002"}}
+    assert data._index_by_rarity == {"Crown": {"001"}, "Three Star": {"002"}}
+    assert "index_by_set" not in vars(data.get_dataset())
+
+
+def test_build_token_index():
+    from ptcgp_api.data import build_token_index
+
+    cards = [
+        {"id": "001", "name": {"de": "Pikachu"}},
+        {"id": "002", "name": {"de": "Raichu"}, "attacks": []},
+        {"id": "003", "name": {"de": "Pikachu ex"}},
+    ]
+    index = build_token_index(cards, build_search_index(cards))
+    tokens, postings = index["de"]["name"]
+    assert tokens == ["ex", "pikachu", "raichu"]
+    assert list(postings[1]) == [0, 2]
+
+
+def test_rank_search_prefix_and_fields():
+    from ptcgp_api.data import rank_search
+
+    assert rank_search("arc", "en") == [0, 1]
+    assert rank_search("ARCEUS lust", "en") == [0, 1]
+    assert rank_search("arceus lust", "en", ["name"]) == []
+    assert rank_search("ceus", "en") == []
+
+
+def test_normalize_text_folds_case_and_accents():
+    from ptcgp_api.data import normalize_text
+
+    assert normalize_text("Pokémon") == "pokemon"
+    assert normalize_text("STRASSE") == normalize_text("Straße")
+    assert normalize_text("Ärger") == "arger"
+    # Compatibility jamo normalize to the same form as composed syllables
+    assert normalize_text("아").startswith(normalize_text("ㅇ"))
+
+
+def test_dataset_snapshot_roundtrip(tmp_path):
+    from ptcgp_api import data
+
+    path = str(tmp_path / "dataset.pickle")
+    data.warm_dataset()
+    data.write_snapshot(data._dataset, path)
+    loaded = data.read_snapshot(data._dataset.version, path)
+    assert loaded is not None
+    assert loaded.cards == data._cards
+    assert loaded.bitmaps == data._bitmaps
+    assert loaded.card_projections["en"] == data.get_card_projections("en")
+    assert data.read_snapshot("other", path) is None
+    assert data.read_snapshot(data._dataset.version, path + ".x") is None
+
+
+def test_shared_dataset_matches_local(tmp_path):
+    from ptcgp_api import data
+    from ptcgp_api.shared import attach_shared
+
+    path = str(tmp_path / "dataset.shm")
+    shared = data.build_dataset()
+    data.share_dataset(shared, path)
+    assert shared.shared is not None
+    assert shared.search_index == {}
+    local = data.get_dataset()
+    for lang in ("de", "en", "xx"):
+        expected = list(local.get_card_projections(lang))
+        assert list(shared.get_card_projections(lang)) == expected
+        assert shared.get_name_index(lang) == local.get_name_index(lang)
+    assert shared.get_card_projection("002", "en")["id"] == "002"
+    assert shared.get_card_projection("999", "en") is None
+    for query in ("arc", "arceus ex", "xyz"):
+        expected = local.rank_search(query, "en")
+        assert shared.rank_search(query, "en") == expected
+
+    # A second worker only maps the existing file
+    other = data.build_dataset()
+    data.share_dataset(other, path)
+    assert other.shared.version == shared.version
+    assert attach_shared(path, "other") is None
+
+
+def test_build_cards_shares_repeated_values():
+    from ptcgp_api.data import build_cards
+
+    attack = {"name": {"de": "Stoß", "en": "Tackle"}, "damage": 30}
+    raw = [
+        {"name": {"de": "Evoli"}, "set_id": "A1", "attacks": [attack]},
+        {"name": {"de": "Evoli"}, "set_id": "A1", "attacks": [dict(attack)]},
+        {"name": {"de": "Mew"}, "set_id": "A2", "hp": "70", "types": ["Psy"]},
+    ]
+    first, second, third = build_cards(raw)
+    assert (first.id, first.local_id, second.local_id) == ("001", "001", "002")
+    assert (third.local_id, third.hp, third.types) == ("001", 70, ("Psy",))
+    assert first.source["attacks"] is second.source["attacks"]
+    assert first.source["name"] is second.source["name"]
+    assert second.source == {**raw[1], "id": "002"}
+    assert not hasattr(first, "__dict__")
+
+
+def test_sort_order_and_walk():
+    from ptcgp_api.data import get_dataset, iter_sorted, parse_sort
+
+    assert parse_sort("hp, -name,+rarity") == (
+        ("hp", False),
+        ("name", True),
+        ("rarity", False),
+    )
+    ds = get_dataset()
+    order, positions = ds.sort_order(parse_sort("rarity"), "en")
+    assert list(order) == [1, 0]
+    assert list(positions) == [1, 0]
+    assert ds.sort_order(parse_sort("rarity"), "de")[0] is order
+    assert list(ds.sort_order(parse_sort("-hp,-id"), "en")[0]) == [1, 0]
+    assert list(iter_sorted(0b11, order, start=1)) == [(1, 0)]
+    assert list(iter_sorted(0b01, order)) == [(1, 0)]
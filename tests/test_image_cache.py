@@ -1,6 +1,7 @@
 import os
 import logging
 from pathlib import Path
+from types import SimpleNamespace
 from cachetools import TTLCache
 import httpx
 import pytest
@@ -92,3 +93,130 @@ async def test_image_url_retry(monkeypatch):
     url = await cards_routes._image_url(client, "de", "A2a", "001")
     assert url.endswith("high.webp")
     assert len(calls) == 2
+
+
+async def test_image_urls_concurrent_and_deduplicated(monkeypatch):
+    import asyncio
+
+    os.environ.pop("SKIP_IMAGE_CHECKS", None)
+    calls = []
+    active = 0
+    peak = 0
+
+    class DummyClient:
+        async def head(self, url, timeout=3):
+            nonlocal active, peak
+            calls.append(url)
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+            class R:
+                status_code = 200 if url.endswith("001/high.webp") else 404
+
+            return R()
+
+    monkeypatch.setattr(
+        cards_routes,
+        "_image_cache",
+        TTLCache(maxsize=100, ttl=10),
+    )
+    monkeypatch.setattr(cards_routes, "_image_semaphore", None)
+    monkeypatch.setattr(cards_routes, "IMAGE_CONCURRENCY", 2)
+
+    cards = [
+        SimpleNamespace(set_id="A2a", local_id=local_id)
+        for local_id in ("001", "001", "002", "003", "004")
+    ]
+    urls = await cards_routes._image_urls(DummyClient(), "de", cards)
+    assert urls[0] == urls[1]
+    assert urls[0].endswith("001/high.webp")
+    assert urls[2].endswith("002/low.webp")
+    # 001 is checked once, the others twice because 404 is retried
+    assert len(calls) == 7
+    assert peak == 2
+    assert cards_routes._image_checks == {}
+
+
+async def test_prewarm_images_persists_snapshot(monkeypatch, tmp_path):
+    import json
+
+    os.environ.pop("SKIP_IMAGE_CHECKS", None)
+    requests = []
+
+    def handler(request):
+        requests.append(str(request.url))
+        ok = request.url.path == "/en/tcgp/A2a/001/high.webp"
+        return httpx.Response(200 if ok else 404)
+
+    monkeypatch.setattr(cards_routes, "_image_availability", set())
+    monkeypatch.setattr(
+        cards_routes,
+        "_image_cache",
+        TTLCache(maxsize=100, ttl=10),
+    )
+    monkeypatch.setattr(cards_routes, "_prewarm_semaphore", None)
+    path = str(tmp_path / "images.json")
+    transport = httpx.MockTransport(handler)
+    async with httpx.AsyncClient(transport=transport) as client:
+        checked = await cards_routes.prewarm_images(client, path)
+        assert checked == 14
+        assert await cards_routes.prewarm_images(client, path) == 0
+
+    # Only existing images are persisted; missing ones expire with the cache
+    with open(path, encoding="utf-8") as f:
+        snapshot = json.load(f)
+    high = "https://assets.tcgdex.net/en/tcgp/A2a/001/high.webp"
+    assert snapshot == {high: True}
+    assert not list(tmp_path.glob("*.tmp"))
+
+    # A restarted process serves known images without requests and checks
+    # missing ones again
+    requests.clear()
+    monkeypatch.setattr(cards_routes, "_image_availability", set())
+    monkeypatch.setattr(
+        cards_routes,
+        "_image_cache",
+        TTLCache(maxsize=100, ttl=10),
+    )
+    assert cards_routes.load_image_snapshot(path) == 1
+    url = await cards_routes._image_url(None, "en", "A2a", "001")
+    assert url.endswith("high.webp")
+    assert requests == []
+    async with httpx.AsyncClient(transport=transport) as client:
+        url = await cards_routes._image_url(client, "de", "A2a", "001")
+    assert url.endswith("low.webp")
+    assert len(requests) == 2
+
+
+async def test_prewarm_uses_own_limiter(monkeypatch, tmp_path):
+    import asyncio
+
+    os.environ.pop("SKIP_IMAGE_CHECKS", None)
+    active = 0
+    peak = 0
+
+    class DummyClient:
+        async def head(self, url, timeout=3):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return SimpleNamespace(status_code=200)
+
+    monkeypatch.setattr(cards_routes, "_image_availability", set())
+    monkeypatch.setattr(
+        cards_routes,
+        "_image_cache",
+        TTLCache(maxsize=100, ttl=10),
+    )
+    monkeypatch.setattr(cards_routes, "_image_semaphore", None)
+    monkeypatch.setattr(cards_routes, "_prewarm_semaphore", None)
+    monkeypatch.setattr(cards_routes, "IMAGE_PREWARM_CONCURRENCY", 2)
+    path = str(tmp_path / "images.json")
+    assert await cards_routes.prewarm_images(DummyClient(), path) == 14
+    assert peak == 2
+    # request-path checks keep their full limit
+    assert cards_routes._image_semaphore is None
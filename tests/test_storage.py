@@ -0,0 +1,104 @@
+import os
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("DATA_DIR", str(Path(__file__).parent / "data"))
+
+from ptcgp_api.storage import SQLiteStorage, open_storage  # noqa: E402
+
+
+def test_open_storage_defaults_to_memory():
+    storage = open_storage("")
+    assert not storage.persistent
+    storage.change_cards("ash", "have", ["001"], [])
+    assert storage.flush() == 0
+    assert storage.load_changes() is None
+    assert [storage.next_id("decks") for _ in range(2)] == ["1", "2"]
+
+
+def test_sqlite_storage_merges_workers(tmp_path):
+    path = str(tmp_path / "users.db")
+    first = SQLiteStorage(path)
+    second = SQLiteStorage(path)
+    assert first.load_changes().users == {}
+    assert second.load_changes().users == {}
+
+    # changes are written behind, as deltas that do not overwrite others
+    first.change_cards("ash", "have", ["001", "002"], [])
+    second.change_cards("ash", "want", ["003"], [])
+    second.change_cards("misty", "have", [], [])
+    assert second.load_changes() is None
+    assert first.flush() == 3
+    assert second.flush() == 3
+    first.change_cards("ash", "have", [], ["002"])
+    first.flush()
+    assert first.load_changes().users == {
+        "ash": {"have": {"001"}, "want": {"003"}},
+        "misty": {"have": set(), "want": set()},
+    }
+    assert first.load_changes() is None
+    assert second.load_changes().users["ash"]["have"] == {"001"}
+
+    ids = [first.next_id("decks"), second.next_id("decks")]
+    assert ids == ["1", "2"]
+    first.add_deck({"id": "1", "name": "Arceus", "cards": [], "votes": 0})
+    first.vote("1", 1)
+    first.add_group({"id": "1", "name": "Club", "members": ["ash"]})
+    first.flush()
+    second.vote("1", 1)
+    second.join_group("1", "misty")
+    second.close()
+    records = first.load_changes()
+    assert records.decks["1"]["votes"] == 2
+    assert records.groups["1"]["members"] == ["ash", "misty"]
+    first.close()
+
+    records = SQLiteStorage(path).load_changes()
+    assert records.users["ash"]["have"] == {"001"}
+    assert records.decks["1"]["name"] == "Arceus"
+
+
+def test_sqlite_flush_keeps_changes_while_locked(tmp_path):
+    path = str(tmp_path / "users.db")
+    storage = SQLiteStorage(path)
+    storage._conn.execute("PRAGMA busy_timeout=0")
+    storage.change_cards("ash", "have", ["001"], [])
+
+    # another worker holds the write lock, so BEGIN IMMEDIATE fails
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    with pytest.raises(sqlite3.OperationalError):
+        storage.flush()
+    other.execute("ROLLBACK")
+    other.close()
+
+    storage.vote("1", 1)
+    assert storage.flush() == 3
+    records = storage.load_changes()
+    assert records.users == {"ash": {"have": {"001"}, "want": set()}}
+    storage.close()
+
+
+def test_sqlite_changes_keep_unflushed_deltas(tmp_path):
+    path = str(tmp_path / "users.db")
+    first = SQLiteStorage(path)
+    second = SQLiteStorage(path)
+    second.load_changes()
+    first.add_deck({"id": "1", "name": "Arceus", "cards": [], "votes": 0})
+    first.change_cards("ash", "have", ["001"], [])
+    first.flush()
+
+    # merging the first worker's records keeps the second's queued deltas
+    second.change_cards("ash", "have", ["002"], ["001"])
+    second.vote("1", 1)
+    records = second.load_changes()
+    assert records.users["ash"] == {"have": {"002"}, "want": set()}
+    assert records.decks["1"]["votes"] == 1
+    assert second.flush() == 4
+    records = first.load_changes()
+    assert records.users["ash"]["have"] == {"002"}
+    assert records.decks["1"]["votes"] == 1
+    first.close()
+    second.close()